@@ -1,12 +1,17 @@
+import bisect
 import json
 import logging
 import os
+import re
 import time
+import unicodedata
 import uuid
 import requests
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 from dotenv import load_dotenv
+from cachetools import LRUCache
+from google.cloud import bigquery
 from clients.gemini import Client as GeminiClient
 from clients.bluesky import Client as BlueskyClient
 
@@ -17,6 +22,232 @@ load_dotenv(override=True)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Language detection patterns
+_EXPLICIT_LANG_PATTERNS = [
+    re.compile(r'lang(?:uage)?[:\s]+([a-z]{2,})'),  # lang:es, language: spanish
+    re.compile(r'\[([a-z]{2,})\]'),                 # [spanish]
+    re.compile(r'\{([a-z]{2,})\}'),                 # {es}
+]
+_BOT_MENTION_PATTERNS = [
+    re.compile(r'@bskyscribe\.bsky\.social'),
+    re.compile(r'@bskyscribe'),
+    re.compile(r'@bot'),
+]
+_WORD_RE = re.compile(r'\b\w+\b')
+# Language mappings for mention-based language requests
+_LANGUAGE_MAP = {
+    # Full names
+    'spanish': 'Spanish', 'español': 'Spanish',
+    'french': 'French', 'français': 'French', 
+    'german': 'German', 'deutsch': 'German',
+    'chinese': 'Chinese', '中文': 'Chinese',
+    'japanese': 'Japanese', '日本語': 'Japanese',
+    'portuguese': 'Portuguese', 'português': 'Portuguese',
+    'italian': 'Italian', 'italiano': 'Italian',
+    'korean': 'Korean', '한국어': 'Korean',
+    'arabic': 'Arabic', 'العربية': 'Arabic',
+    
+    # ISO codes
+    'es': 'Spanish', 'fr': 'French', 'de': 'German',
+    'zh': 'Chinese', 'ja': 'Japanese', 'pt': 'Portuguese', 
+    'it': 'Italian', 'ko': 'Korean', 'ar': 'Arabic'
+}
+
+# Short tokens that are common English words rather than ISO language codes
+_ISO_CODE_STOPWORDS = frozenset({'it', 'is', 'in', 'to', 'be', 'we', 'he', 'me', 'no', 'so', 'go', 'do'})
+_NATURAL_LANG_PATTERNS = [
+    re.compile(r'in\s+([a-z]{2,})(?:\s|$|[.,!?])'),    # "in spanish"
+    re.compile(r'to\s+([a-z]{2,})(?:\s|$|[.,!?])'),    # "to french"
+    re.compile(r'as\s+([a-z]{2,})(?:\s|$|[.,!?])'),    # "as german"
+]
+
+# JSON cleanup patterns
+_QUOTE_BEFORE_BRACE_RE = re.compile(r'"\s*\n\s*}')
+_QUOTE_BEFORE_BRACKET_RE = re.compile(r'"\s*\n\s*]')
+_TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+_UNQUOTED_KEY_RE = re.compile(r'(\w+):')
+_SINGLE_QUOTED_RE = re.compile(r"'([^']*)'")
+_CONTROL_CHARS_RE = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]')
+_CR_TAB_RE = re.compile(r'[\r\t]')
+_AT_FIELD_RE = re.compile(r'"([^"]+)":\s*"([^"]*@[^"]*)"')
+_FIELD_LINE_RE = re.compile(r'^(\s*"[^"]+"\s*:\s*")([^"]*(?:[^\\"]|\\.)*)("\s*,?\s*)$')
+_UNESCAPED_QUOTE_RE = re.compile(r'(?<!\\)"')
+
+# Citation brackets like [1], [2, 3], [i], [ii], [a], [b] with optional preceding space
+_CITATION_RE = re.compile(r'\s*\[\s*[a-zA-Z0-9]+(?:\s*,\s*[a-zA-Z0-9]+)*\s*\]')
+_QUOTE_STRIP = str.maketrans('', '', '"\'')
+# ASCII control characters other than newline, carriage return and tab
+_NON_PRINTABLE_STRIP = dict.fromkeys(code for code in range(32) if chr(code) not in '\n\r\t')
+
+# Canned reply texts
+_NO_CLAIMS_MESSAGE = "Thanks for the mention! I didn't find any specific factual claims to verify in this post."
+_NO_FACT_CHECK_RESPONSE = "Unable to generate fact-check response"
+_NO_TRANSCRIPTION_RESPONSE = "Unable to process media content"
+
+# Content pattern checks
+_STAT_RE = re.compile(r'\d+%|\d+\s*(?:million|billion|thousand)|\d+\.\d+|\$\d+', re.IGNORECASE)
+_DATE_RE = re.compile(
+    r'\d{4}'                        # Year
+    r'|\d{1,2}/\d{1,2}/\d{2,4}'      # Date format
+    r'|january|february|march|april|may|june|july|august|september|october|november|december'
+    r'|today|yesterday|tomorrow|last week|next week',
+    re.IGNORECASE
+)
+# Link scheme anywhere in a post
+_URL_PROBE = re.compile(r'https?://', re.IGNORECASE)
+
+# Straight or curly double quotes, or reported speech; only ASCII case variants of 'said' count,
+# matching a plain 'said' in text.lower() without the copy
+_QUOTE_RE = re.compile(r'["“”]|[Ss][Aa][Ii][Dd]')
+
+# Phrase lists for the content pattern classifiers
+_ANGRY_WORDS = ['outrageous', 'disgusting', 'terrible', 'awful', 'hate', 'angry', 'furious']
+_FEARFUL_WORDS = ['dangerous', 'scary', 'terrifying', 'threat', 'warning', 'beware']
+_URGENT_WORDS = ['urgent', 'breaking', 'immediate', 'now', 'alert', 'emergency']
+_SENSATIONAL_WORDS = ['shocking', 'unbelievable', 'incredible', 'amazing', 'stunning']
+_ABSOLUTE_WORDS = ['always', 'never', 'all', 'none', 'every', 'no one', 'everyone', 'everything', 'nothing']
+_URGENCY_PHRASES = ['breaking', 'urgent', 'immediate', 'act now', 'don\'t wait', 'hurry', 'quickly']
+_AUTHORITY_PHRASES = ['experts say', 'studies show', 'research proves', 'scientists confirm', 'doctors recommend']
+_ANECDOTE_PHRASES = ['i know someone', 'my friend', 'my family', 'happened to me', 'i saw', 'i heard']
+
+# Classifier vocabulary keyed by category
+_CLASSIFIER_VOCABULARY = {
+    'angry': _ANGRY_WORDS,
+    'fearful': _FEARFUL_WORDS,
+    'urgent': _URGENT_WORDS,
+    'sensational': _SENSATIONAL_WORDS,
+    'absolutes': _ABSOLUTE_WORDS,
+    'urgency': _URGENCY_PHRASES,
+    'authority': _AUTHORITY_PHRASES,
+    'anecdote': _ANECDOTE_PHRASES,
+}
+
+# Tone categories in priority order - first matching tone wins
+_TONE_PRIORITY = [
+    ('angry', 'ANGRY'),
+    ('fearful', 'FEARFUL'),
+    ('urgent', 'URGENT'),
+    ('sensational', 'SENSATIONAL'),
+]
+
+
+def _build_phrase_alternation(vocabulary: Dict[str, List[str]]):
+    """Build one regex alternation over the whole vocabulary and a phrase -> categories map"""
+    phrase_categories = {}
+    for category, phrases in vocabulary.items():
+        for phrase in phrases:
+            phrase_categories.setdefault(phrase, set()).add(category)
+    
+    # At a given position only the longest phrase is captured, so it also
+    # credits the categories of any shorter phrase it starts with
+    resolved = {}
+    for phrase in phrase_categories:
+        categories = set()
+        for other, other_categories in phrase_categories.items():
+            if phrase.startswith(other):
+                categories |= other_categories
+        resolved[phrase] = frozenset(categories)
+    
+    alternation = '|'.join(re.escape(phrase) for phrase in sorted(resolved, key=len, reverse=True))
+    return alternation, resolved
+
+
+_PHRASE_ALTERNATION, _PHRASE_CATEGORIES = _build_phrase_alternation(_CLASSIFIER_VOCABULARY)
+
+# Content features in two scans. Each feature sits in its own optional
+# zero-width lookahead so overlapping hits (e.g. "2020" as both a year and a
+# number) are all recorded; the trailing conditional rejects positions where
+# nothing matched. Numbers and dates match the original text case-insensitively,
+# while quotes and phrases match text.lower() exactly, so Unicode case folding
+# (e.g. 'ſ' matching 's') can't produce a phrase missing from _PHRASE_CATEGORIES.
+_NUMERIC_FEATURE_RE = re.compile(
+    rf'(?:(?=(?P<statistics>{_STAT_RE.pattern})))?'
+    rf'(?:(?=(?P<dates>{_DATE_RE.pattern})))?'
+    r'(?(statistics)|(?(dates)|(?!)))',
+    re.IGNORECASE
+)
+_LOWERED_FEATURE_RE = re.compile(
+    rf'(?:(?=(?P<quotes>{_QUOTE_RE.pattern})))?'
+    rf'(?:(?=(?P<phrase>{_PHRASE_ALTERNATION})))?'
+    r'(?(quotes)|(?(phrase)|(?!)))'
+)
+
+# Manual JSON field extraction patterns
+_THINKING_RE = re.compile(r'"thinking":\s*"([^"]+)"', re.DOTALL)
+_ACCURATE_RE = re.compile(r'"substantially_accurate":\s*(true|false)')
+_CATEGORY_RE = re.compile(r'"category":\s*"([^"]+)"')
+_RESPONSE_RE = re.compile(r'"response":\s*"([^"]+)"', re.DOTALL)
+_SOURCES_ARRAY_RE = re.compile(r'"sources":\s*\[')
+_SOURCE_TITLE_RE = re.compile(r'"title":\s*"([^"]+)"')
+_SOURCE_PUBLISHER_RE = re.compile(r'"publisher":\s*"([^"]+)"')
+_SOURCE_RELEVANCE_RE = re.compile(r'"relevance":\s*"([^"]+)"')
+
+# Decoder that accepts raw control characters (e.g. literal newlines) inside strings
+_LENIENT_JSON_DECODER = json.JSONDecoder(strict=False)
+
+
+def _iter_balanced_objects(text: str, start: int = 0):
+    """Yield each top-level balanced {...} object from start, ignoring braces inside strings and stopping at an unmatched ']'"""
+    depth = 0
+    in_string = False
+    escaped = False
+    object_start = None
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            if depth == 0:
+                object_start = i
+            depth += 1
+        elif char == '}':
+            if depth > 0:
+                depth -= 1
+                if depth == 0:
+                    yield text[object_start:i + 1]
+        elif char == ']' and depth == 0:
+            return
+
+
+def _extract_json_object(text: str) -> Optional[str]:
+    """Return the first balanced {...} object in text, ignoring braces inside string values"""
+    start = text.find('{')
+    if start == -1:
+        return None
+    return next(_iter_balanced_objects(text, start), None)
+
+# Source lookup for a single fact-check; the id is bound as a query parameter
+_SOURCES_BY_ID_QUERY = """
+            SELECT sources 
+            FROM `{project_id}.{dataset_id}.{table_id}` 
+            WHERE id = @fact_check_id
+            LIMIT 1
+            """
+
+# Prompt used to compress over-long fact-check responses
+_LENGTH_REDUCTION_PROMPT_FILE = "prompt/length_reduction.txt"
+_MAX_REPLY_CHARS = 285
+
+
+def _truncate_reply(text: str, limit: int = _MAX_REPLY_CHARS) -> str:
+    """Truncate text to limit characters plus an ellipsis without splitting a character from its combining marks"""
+    if len(text) <= limit:
+        return text
+    
+    cut = limit
+    # Back off so accents, variation selectors and joiners stay with their base character
+    while cut > 0 and (unicodedata.combining(text[cut]) or text[cut] in '\u200d\ufe0e\ufe0f'):
+        cut -= 1
+    return text[:cut] + "..."
+
+
 class MediaProcessingBot:
     """Bluesky media processing bot that summarizes audio/video and describes/reads images from posts"""
     
@@ -28,8 +259,30 @@ class MediaProcessingBot:
         self.bluesky_password = bluesky_password or os.getenv('BLUESKY_PASSWORD')
         self.prompt_file = prompt_file  
         
-        # In-memory mapping of post URIs to transcription IDs for analytics
-        self.post_to_transcription_map = {}
+        # Load prompt templates once at startup rather than on every request
+        with open(self.prompt_file, 'r') as f:
+            self.prompt_template = f.read()
+        try:
+            with open(_LENGTH_REDUCTION_PROMPT_FILE, 'r') as f:
+                self.length_reduction_template = f.read()
+        except FileNotFoundError:
+            self.length_reduction_template = None
+        
+        # BigQuery location of fact-check records, resolved once
+        self.bigquery_project_id = os.getenv('BIGQUERY_PROJECT_ID')
+        self.bigquery_dataset_id = os.getenv('BIGQUERY_DATASET_ID', 'dataset')
+        self.bigquery_table_id = os.getenv('BIGQUERY_TABLE_ID', 'fact-checker')
+        self._sources_by_id_sql = _SOURCES_BY_ID_QUERY.format(
+            project_id=self.bigquery_project_id,
+            dataset_id=self.bigquery_dataset_id,
+            table_id=self.bigquery_table_id
+        )
+        # Logging destination keeps its own defaults when the env vars are unset
+        self._log_dataset_id = os.getenv('BIGQUERY_DATASET_ID', 'fact_checks')
+        self._log_table_id = os.getenv('BIGQUERY_TABLE_ID', 'responses')
+        
+        # In-memory mapping of post URIs to transcription IDs for analytics, bounded for long-running daemons
+        self.post_to_transcription_map = LRUCache(maxsize=10000)
         
         # Validate required credentials
         if not self.gemini_api_key:
@@ -41,84 +294,51 @@ class MediaProcessingBot:
         
         # Initialize clients
         self.gemini_client = GeminiClient(api_key=self.gemini_api_key)
-        self.bluesky_client = BlueskyClient(username=self.bluesky_username, password=self.bluesky_password)
+        self.bluesky_client = BlueskyClient(
+            username=self.bluesky_username,
+            password=self.bluesky_password,
+            session_path=os.getenv('BLUESKY_SESSION_FILE', os.path.expanduser('~/.cache/bskyscribe/session'))
+        )
     
     def extract_language_from_mention(self, mention_text: str) -> str:
         """Extract requested language from mention text - PROXIMITY-BASED detection only"""
         if not mention_text:
             return "English"
         
-        import re
-        
-        # Language mappings
-        language_map = {
-            # Full names
-            'spanish': 'Spanish', 'español': 'Spanish',
-            'french': 'French', 'français': 'French', 
-            'german': 'German', 'deutsch': 'German',
-            'chinese': 'Chinese', '中文': 'Chinese',
-            'japanese': 'Japanese', '日本語': 'Japanese',
-            'portuguese': 'Portuguese', 'português': 'Portuguese',
-            'italian': 'Italian', 'italiano': 'Italian',
-            'korean': 'Korean', '한국어': 'Korean',
-            'arabic': 'Arabic', 'العربية': 'Arabic',
-            
-            # ISO codes
-            'es': 'Spanish', 'fr': 'French', 'de': 'German',
-            'zh': 'Chinese', 'ja': 'Japanese', 'pt': 'Portuguese', 
-            'it': 'Italian', 'ko': 'Korean', 'ar': 'Arabic'
-        }
-        
         text_lower = mention_text.lower().strip()
         
         # 1. HIGHEST PRIORITY: Explicit structured syntax (anywhere in text)
-        explicit_patterns = [
-            r'lang(?:uage)?[:\s]+([a-z]{2,})',  # lang:es, language: spanish
-            r'\[([a-z]{2,})\]',                 # [spanish]
-            r'\{([a-z]{2,})\}',                 # {es}
-        ]
-        
-        for pattern in explicit_patterns:
-            match = re.search(pattern, text_lower)
+        for pattern in _EXPLICIT_LANG_PATTERNS:
+            match = pattern.search(text_lower)
             if match:
-                lang_key = match.group(1).lower()
-                if lang_key in language_map:
-                    return language_map[lang_key]
+                lang_key = match.group(1)
+                if lang_key in _LANGUAGE_MAP:
+                    return _LANGUAGE_MAP[lang_key]
         
         # 2. PROXIMITY-BASED DETECTION: Language must be within 1-2 words of @mention
         # Find bot mention position
-        bot_mention_patterns = [
-            r'@bskyscribe\.bsky\.social',
-            r'@bskyscribe',
-            r'@bot'
-        ]
-        
-        mention_positions = []
-        for pattern in bot_mention_patterns:
-            for match in re.finditer(pattern, text_lower):
-                mention_positions.append(match.start())
+        # The full handle also matches the short forms; keep each position once, in pattern order
+        mention_positions = list(dict.fromkeys(
+            match.start() for pattern in _BOT_MENTION_PATTERNS for match in pattern.finditer(text_lower)
+        ))
         
         if not mention_positions:
             # No bot mention found, default to English
             return "English"
         
         # Extract words and their positions
-        words_with_positions = []
-        for match in re.finditer(r'\b\w+\b', text_lower):
-            words_with_positions.append((match.group(), match.start(), match.end()))
+        words_with_positions = [(match.group(), match.start(), match.end()) for match in _WORD_RE.finditer(text_lower)]
+        word_starts = [start_pos for _, start_pos, _ in words_with_positions]
         
         # For each mention, check words within strict proximity window
         for mention_pos in mention_positions:
             # Find the word index that represents the end of the mention
             mention_end = mention_pos + len("@bskyscribe.bsky.social")  # Calculate mention end position
-            mention_word_index = None
-            
-            for i, (word, start_pos, end_pos) in enumerate(words_with_positions):
-                # Find the last word that overlaps with or is part of the mention
-                if start_pos <= mention_end and end_pos >= mention_pos:
-                    mention_word_index = i
             
-            if mention_word_index is None:
+            # Last word that overlaps with or is part of the mention; words are sorted and
+            # non-overlapping, so it is the last one starting at or before mention_end
+            mention_word_index = bisect.bisect_right(word_starts, mention_end) - 1
+            if mention_word_index < 0 or words_with_positions[mention_word_index][2] < mention_pos:
                 continue
             
             # Check ONLY 1-2 words AFTER the mention (safer, more natural)
@@ -126,35 +346,29 @@ class MediaProcessingBot:
             start_idx = mention_word_index + 1  # Start after mention
             end_idx = min(len(words_with_positions), mention_word_index + proximity_range + 1)
             
-            nearby_words = []
-            for i in range(start_idx, end_idx):
-                nearby_words.append(words_with_positions[i][0])
+            nearby_words = [word for word, _, _ in words_with_positions[start_idx:end_idx]]
             
             # Check if any nearby words are language keywords
             for word in nearby_words:
-                if word in language_map:
+                if word in _LANGUAGE_MAP:
                     # Additional validation for short ISO codes
                     if len(word) <= 3:
                         # For ISO codes, ensure it's not part of common English words
-                        if word in ['it', 'is', 'in', 'to', 'be', 'we', 'he', 'me', 'no', 'so', 'go', 'do']:
+                        if word in _ISO_CODE_STOPWORDS:
                             continue
-                    return language_map[word]
+                    return _LANGUAGE_MAP[word]
         
         # 3. NATURAL LANGUAGE PATTERNS (with proximity)
-        natural_patterns = [
-            r'in\s+([a-z]{2,})(?:\s|$|[.,!?])',    # "in spanish"
-            r'to\s+([a-z]{2,})(?:\s|$|[.,!?])',    # "to french"
-            r'as\s+([a-z]{2,})(?:\s|$|[.,!?])',    # "as german"
-        ]
-        
+        # Scan the text once per pattern, not once per pattern per mention
+        natural_matches = [[(match.start(), match.group(1)) for match in pattern.finditer(text_lower)]
+                           for pattern in _NATURAL_LANG_PATTERNS]
         for mention_pos in mention_positions:
             # Check natural patterns within proximity of mentions
-            for pattern in natural_patterns:
-                for match in re.finditer(pattern, text_lower):
-                    if abs(match.start() - mention_pos) <= 20:  # Strict proximity
-                        lang_key = match.group(1).lower()
-                        if lang_key in language_map:
-                            return language_map[lang_key]
+            for matches in natural_matches:
+                for match_start, lang_key in matches:
+                    if abs(match_start - mention_pos) <= 20:  # Strict proximity
+                        if lang_key in _LANGUAGE_MAP:
+                            return _LANGUAGE_MAP[lang_key]
         
         # Default: No language detected near bot mentions
         return "English"
@@ -166,7 +380,7 @@ class MediaProcessingBot:
         logger.info(f"Starting transcription in {language} (max {max_retries} attempts)")
         
         for attempt in range(max_retries):
-            logger.debug(f"Transcription attempt {attempt + 1}/{max_retries}")
+            logger.debug("Transcription attempt %s/%s", attempt + 1, max_retries)
             
             try:
                 result = self._transcription_attempt(post_url, language)
@@ -211,19 +425,17 @@ class MediaProcessingBot:
         if not media_items:
             return {"error": "No media found in post"}
         
-        # Load prompt template from file
-        with open(self.prompt_file, 'r') as f:
-            prompt_template = f.read()
-        
         # Format prompt with language
-        formatted_prompt = prompt_template.format(language=language)
+        formatted_prompt = self.prompt_template.format(language=language)
         
-        # Process first media item (for now)
-        media_item = media_items[0]
-        media_url = media_item["url"]
+        # An image gallery is described in one request; otherwise process the first media item
+        if len(media_items) > 1 and all(item.get("type") == "image" for item in media_items):
+            media_urls = [item["url"] for item in media_items]
+        else:
+            media_urls = [media_items[0]["url"]]
         
         # Call Gemini media processing with structured output
-        gemini_response = self.gemini_client.process_media(media_url, formatted_prompt)
+        gemini_response = self.gemini_client.process_media_batch(media_urls, formatted_prompt)
         
         # Parse JSON response
         try:
@@ -268,18 +480,12 @@ class MediaProcessingBot:
         if not thread_data:
             return {"error": "Could not retrieve post data"}
             
-        # Load prompt template from file
-        with open(self.prompt_file, 'r') as f:
-            prompt_template = f.read()
-            
         # Format prompt with structured thread data
         request_info = thread_data.get("request", {})
         target_info = thread_data.get("target", {})
         context_info = thread_data.get("context", {})
         
-        from datetime import datetime
-        
-        prompt = prompt_template.format(
+        prompt = self.prompt_template.format(
             current_date=datetime.now().strftime("%Y-%m-%d"),
             request_type=request_info.get("type", "fact_check"),
             requester=request_info.get("requester", "@unknown").replace("@", ""),
@@ -323,7 +529,7 @@ class MediaProcessingBot:
             logger.debug("JSON parsed directly")
             return parsed_json
         except json.JSONDecodeError as e:
-            logger.debug(f"Direct JSON parsing failed: {e}")
+            logger.debug("Direct JSON parsing failed: %s", e)
         
         # Enhanced extraction with cleanup
         try:
@@ -360,14 +566,14 @@ class MediaProcessingBot:
             
         except (json.JSONDecodeError, ValueError) as e:
             logger.error(f"JSON parsing failed: {e}")
-            logger.debug(f"Raw response (first 500 chars): {json_str_to_parse[:500]}")
+            logger.debug("Raw response (first 500 chars): %s", json_str_to_parse[:500])
             
-            # Debug logging for troubleshooting
-            if hasattr(e, 'pos'):
+            # Debug logging for troubleshooting; skip slicing the context when it won't be emitted
+            if hasattr(e, 'pos') and logger.isEnabledFor(logging.DEBUG):
                 error_pos = getattr(e, 'pos', 0)
-                logger.debug(f"Parse error at position {error_pos}")
+                logger.debug("Parse error at position %s", error_pos)
                 context = json_str_to_parse[max(0, error_pos-50):error_pos+50]
-                logger.debug(f"Error context: ...{context}...")
+                logger.debug("Error context: ...%s...", context)
             
             # Try manual parsing for common patterns
             try:
@@ -376,7 +582,7 @@ class MediaProcessingBot:
                     logger.info("Successfully extracted JSON manually")
                     return manual_result
             except Exception as manual_e:
-                logger.debug(f"Manual extraction also failed: {manual_e}")
+                logger.debug("Manual extraction also failed: %s", manual_e)
             
             # Final fallback - try to create a minimal valid response
             return {
@@ -390,8 +596,6 @@ class MediaProcessingBot:
     
     def _clean_json_string(self, json_str: str) -> str:
         """Clean up common JSON formatting issues"""
-        import re
-        
         # Remove common prefixes/suffixes that break JSON
         cleaned = json_str.strip()
         
@@ -407,23 +611,23 @@ class MediaProcessingBot:
         cleaned = cleaned.strip()
         
         # Fix missing commas before closing braces/brackets
-        cleaned = re.sub(r'"\s*\n\s*}', '"\n}', cleaned)
-        cleaned = re.sub(r'"\s*\n\s*]', '"\n]', cleaned)
+        cleaned = _QUOTE_BEFORE_BRACE_RE.sub('"\n}', cleaned)
+        cleaned = _QUOTE_BEFORE_BRACKET_RE.sub('"\n]', cleaned)
         
         # Fix trailing commas
-        cleaned = re.sub(r',(\s*[}\]])', r'\1', cleaned)
+        cleaned = _TRAILING_COMMA_RE.sub(r'\1', cleaned)
         
         # Fix missing quotes around keys
-        cleaned = re.sub(r'(\w+):', r'"\1":', cleaned)
+        cleaned = _UNQUOTED_KEY_RE.sub(r'"\1":', cleaned)
         
         # Fix single quotes to double quotes
-        cleaned = re.sub(r"'([^']*)'", r'"\1"', cleaned)
+        cleaned = _SINGLE_QUOTED_RE.sub(r'"\1"', cleaned)
         
         # Fix escaped characters that break JSON
         cleaned = cleaned.replace('\\"', '"').replace("\\'", "'")
         
         # Remove any non-printable characters
-        cleaned = ''.join(char for char in cleaned if ord(char) >= 32 or char in '\n\r\t')
+        cleaned = cleaned.translate(_NON_PRINTABLE_STRIP)
         
         # Remove common text before JSON
         prefixes_to_remove = [
@@ -439,7 +643,7 @@ class MediaProcessingBot:
         
         # Handle control characters and escape sequences
         # Replace problematic control characters
-        cleaned = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', cleaned)
+        cleaned = _CONTROL_CHARS_RE.sub('', cleaned)
         
         # Fix @ symbols that can break JSON parsing
         # Escape @ symbols that appear unescaped in string values
@@ -454,18 +658,16 @@ class MediaProcessingBot:
         
         # Don't escape newlines - JSON parsing can handle proper line breaks
         # Only escape problematic characters that are actually inside string values
-        cleaned = re.sub(r'[\r\t]', ' ', cleaned)  # Replace tabs and carriage returns with spaces
+        cleaned = _CR_TAB_RE.sub(' ', cleaned)  # Replace tabs and carriage returns with spaces
         
         return cleaned.strip()
     
     def _remove_citation_brackets(self, json_str: str) -> str:
         """Remove citation brackets like [1], [2, 3] from JSON string values"""
-        import re
-        
         try:
             # Remove citation patterns from anywhere in the JSON
             # Patterns like [1], [2, 3], [i], [ii], [a], [b], etc.
-            cleaned = re.sub(r'\s*\[\s*[a-zA-Z0-9]+(?:\s*,\s*[a-zA-Z0-9]+)*\s*\]', '', json_str)
+            cleaned = _CITATION_RE.sub('', json_str)
             return cleaned
             
         except Exception as e:
@@ -474,8 +676,6 @@ class MediaProcessingBot:
     
     def _fix_at_symbols(self, json_str: str) -> str:
         """Fix @ symbols that can break JSON parsing by removing them from string values"""
-        import re
-        
         try:
             # Pattern to find JSON string values and remove @ symbols from them
             def clean_string_value(match):
@@ -486,8 +686,7 @@ class MediaProcessingBot:
                 return f'"{field_name}": "{cleaned_value}"'
             
             # Match JSON field patterns like "field": "value@with@symbols"
-            pattern = r'"([^"]+)":\s*"([^"]*@[^"]*)"'
-            cleaned = re.sub(pattern, clean_string_value, json_str)
+            cleaned = _AT_FIELD_RE.sub(clean_string_value, json_str)
             
             return cleaned
             
@@ -497,8 +696,6 @@ class MediaProcessingBot:
     
     def _fix_unescaped_quotes(self, json_str: str) -> str:
         """Fix unescaped quotes within JSON string values"""
-        import re
-        
         try:
             # Simple approach: escape all unescaped quotes except field boundaries
             lines = json_str.split('\n')
@@ -512,14 +709,14 @@ class MediaProcessingBot:
                     
                 # For lines with JSON fields, be more careful
                 # Pattern: find the value part of "field": "value"
-                match = re.match(r'^(\s*"[^"]+"\s*:\s*")([^"]*(?:[^\\"]|\\.)*)("\s*,?\s*)$', line)
+                match = _FIELD_LINE_RE.match(line)
                 if match:
                     prefix = match.group(1)  # "field": "
                     value = match.group(2)   # the value content
                     suffix = match.group(3)  # ",
                     
                     # Escape unescaped quotes in the value
-                    fixed_value = re.sub(r'(?<!\\)"', '\\"', value)
+                    fixed_value = _UNESCAPED_QUOTE_RE.sub('\\"', value)
                     line = prefix + fixed_value + suffix
                 
                 fixed_lines.append(line)
@@ -553,7 +750,7 @@ class MediaProcessingBot:
         try:
             # Basic URL format validation
             if not url.startswith(('http://', 'https://')):
-                logger.debug(f"Invalid URL format: {url}")
+                logger.debug("Invalid URL format: %s", url)
                 return False
             
             # Make HEAD request to check if URL exists
@@ -566,20 +763,20 @@ class MediaProcessingBot:
             
             # Check for successful response codes
             if response.status_code in [200, 301, 302, 303]:
-                logger.debug(f"URL valid: {url}")
+                logger.debug("URL valid: %s", url)
                 return True
             else:
                 logger.warning(f"URL returned error status {response.status_code}: {url}")
                 return False
                 
         except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
-            logger.debug(f"URL unreachable: {url}")
+            logger.debug("URL unreachable: %s", url)
             return False
         except requests.exceptions.RequestException as e:
-            logger.debug(f"URL validation failed: {url} - {e}")
+            logger.debug("URL validation failed: %s - %s", url, e)
             return False
         except Exception as e:
-            logger.debug(f"URL validation error: {url} - {e}")
+            logger.debug("URL validation error: %s - %s", url, e)
             return False
     
     def _create_inconclusive_response(self) -> Dict[str, Any]:
@@ -619,6 +816,9 @@ class MediaProcessingBot:
             # Get content analysis from LLM response or fallback to manual analysis
             content_analysis = result.get('content_analysis', {})
             
+            # Extract every content pattern at once for the fallbacks
+            features = self.extract_features(post_text)
+            
             # Use the fact-check ID generated at method start
             
             # Handle status field with error metadata
@@ -643,103 +843,104 @@ class MediaProcessingBot:
                 'is_weekend': now.weekday() >= 5,
                 
                 # Content patterns from LLM analysis (with fallbacks)
-                'emotional_tone': content_analysis.get('emotional_tone', self._detect_emotional_tone(post_text)),
-                'contains_statistics': content_analysis.get('contains_statistics', self._contains_statistics(post_text)),
-                'contains_quotes': content_analysis.get('contains_quotes', self._contains_quotes(post_text)),
-                'contains_dates': content_analysis.get('contains_dates', self._contains_dates(post_text)),
-                'uses_absolutes': content_analysis.get('uses_absolutes', self._uses_absolutes(post_text)),
-                'creates_urgency': content_analysis.get('creates_urgency', self._creates_urgency(post_text)),
-                'appeals_to_authority': content_analysis.get('appeals_to_authority', self._appeals_to_authority(post_text)),
-                'personal_anecdote': content_analysis.get('personal_anecdote', self._personal_anecdote(post_text)),
+                'emotional_tone': content_analysis.get('emotional_tone', features['emotional_tone']),
+                'contains_statistics': content_analysis.get('contains_statistics', features['contains_statistics']),
+                'contains_quotes': content_analysis.get('contains_quotes', features['contains_quotes']),
+                'contains_dates': content_analysis.get('contains_dates', features['contains_dates']),
+                'uses_absolutes': content_analysis.get('uses_absolutes', features['uses_absolutes']),
+                'creates_urgency': content_analysis.get('creates_urgency', features['creates_urgency']),
+                'appeals_to_authority': content_analysis.get('appeals_to_authority', features['appeals_to_authority']),
+                'personal_anecdote': content_analysis.get('personal_anecdote', features['personal_anecdote']),
                 
                 # Information structure (manual analysis)
-                'has_external_links': 'http' in post_text.lower(),
+                'has_external_links': _URL_PROBE.search(post_text) is not None,
                 'has_images': False,  # Could analyze thread_data if needed
                 'has_videos': False,  # Could analyze thread_data if needed
                 'mention_count': post_text.count('@'),
                 'hashtag_count': post_text.count('#'),
                 'question_marks_count': post_text.count('?'),
                 'exclamation_marks_count': post_text.count('!'),
-                'all_caps_words_count': len([word for word in post_text.split() if word.isupper() and len(word) > 1])
+                'all_caps_words_count': sum(1 for word in post_text.split() if word.isupper() and len(word) > 1)
             }
             
             # Save to BigQuery
             df = pd.DataFrame([record])
-            dataset_id = os.getenv('BIGQUERY_DATASET_ID', 'fact_checks')
-            table_id = os.getenv('BIGQUERY_TABLE_ID', 'responses')
-            
-            self.bq_client.append(df, dataset_id, table_id, create_if_not_exists=True)
-            logger.debug(f"Logged fact-check to BigQuery: {fact_check_id}")
+            self.bq_client.append(df, self._log_dataset_id, self._log_table_id, create_if_not_exists=True)
+            logger.debug("Logged fact-check to BigQuery: %s", fact_check_id)
             
         except Exception as e:
             logger.error(f"BigQuery logging failed: {e}")
         
         return fact_check_id
     
-    def _detect_emotional_tone(self, text: str) -> str:
+    def _classify_all(self, text: str) -> frozenset:
+        """Return every content feature category present in text"""
+        categories = set()
+        for match in _NUMERIC_FEATURE_RE.finditer(text):
+            statistics, dates = match.group('statistics', 'dates')
+            if statistics is not None:
+                categories.add('statistics')
+            if dates is not None:
+                categories.add('dates')
+        for match in _LOWERED_FEATURE_RE.finditer(text.lower()):
+            quotes, phrase = match.group('quotes', 'phrase')
+            if quotes is not None:
+                categories.add('quotes')
+            if phrase is not None:
+                categories |= _PHRASE_CATEGORIES[phrase]
+        return frozenset(categories)
+    
+    def extract_features(self, text: str) -> Dict[str, Any]:
+        """Extract all content pattern flags in one call"""
+        categories = self._classify_all(text)
+        return {
+            'emotional_tone': self._detect_emotional_tone(text, categories),
+            'contains_statistics': 'statistics' in categories,
+            'contains_quotes': 'quotes' in categories,
+            'contains_dates': 'dates' in categories,
+            'uses_absolutes': 'absolutes' in categories,
+            'creates_urgency': 'urgency' in categories,
+            'appeals_to_authority': 'authority' in categories,
+            'personal_anecdote': 'anecdote' in categories
+        }
+    
+    def _detect_emotional_tone(self, text: str, categories: Optional[frozenset] = None) -> str:
         """Simple emotional tone detection"""
-        text_lower = text.lower()
-        angry_words = ['outrageous', 'disgusting', 'terrible', 'awful', 'hate', 'angry', 'furious']
-        fearful_words = ['dangerous', 'scary', 'terrifying', 'threat', 'warning', 'beware']
-        urgent_words = ['urgent', 'breaking', 'immediate', 'now', 'alert', 'emergency']
-        sensational_words = ['shocking', 'unbelievable', 'incredible', 'amazing', 'stunning']
-        
-        if any(word in text_lower for word in angry_words):
-            return 'ANGRY'
-        elif any(word in text_lower for word in fearful_words):
-            return 'FEARFUL'
-        elif any(word in text_lower for word in urgent_words):
-            return 'URGENT'
-        elif any(word in text_lower for word in sensational_words):
-            return 'SENSATIONAL'
-        else:
-            return 'NEUTRAL'
+        if categories is None:
+            categories = self._classify_all(text)
+        for category, tone in _TONE_PRIORITY:
+            if category in categories:
+                return tone
+        return 'NEUTRAL'
     
     def _contains_statistics(self, text: str) -> bool:
         """Check if text contains statistics/numbers"""
-        import re
         # Look for percentages, numbers with units, etc.
-        patterns = [r'\d+%', r'\d+\s*(million|billion|thousand)', r'\d+\.\d+', r'\$\d+']
-        return any(re.search(pattern, text, re.IGNORECASE) for pattern in patterns)
+        return bool(_STAT_RE.search(text))
     
     def _contains_quotes(self, text: str) -> bool:
         """Check if text contains quoted speech"""
-        return '"' in text or '"' in text or '"' in text or 'said' in text.lower()
+        return _QUOTE_RE.search(text) is not None
     
     def _contains_dates(self, text: str) -> bool:
         """Check if text contains dates"""
-        import re
-        date_patterns = [
-            r'\d{4}',  # Year
-            r'\d{1,2}/\d{1,2}/\d{2,4}',  # Date format
-            r'(january|february|march|april|may|june|july|august|september|october|november|december)',
-            r'(today|yesterday|tomorrow|last week|next week)'
-        ]
-        return any(re.search(pattern, text, re.IGNORECASE) for pattern in date_patterns)
+        return bool(_DATE_RE.search(text))
     
     def _uses_absolutes(self, text: str) -> bool:
         """Check if text uses absolute terms"""
-        absolutes = ['always', 'never', 'all', 'none', 'every', 'no one', 'everyone', 'everything', 'nothing']
-        text_lower = text.lower()
-        return any(absolute in text_lower for absolute in absolutes)
+        return 'absolutes' in self._classify_all(text)
     
     def _creates_urgency(self, text: str) -> bool:
         """Check if text creates urgency"""
-        urgent_phrases = ['breaking', 'urgent', 'immediate', 'act now', 'don\'t wait', 'hurry', 'quickly']
-        text_lower = text.lower()
-        return any(phrase in text_lower for phrase in urgent_phrases)
+        return 'urgency' in self._classify_all(text)
     
     def _appeals_to_authority(self, text: str) -> bool:
         """Check if text appeals to authority"""
-        authority_phrases = ['experts say', 'studies show', 'research proves', 'scientists confirm', 'doctors recommend']
-        text_lower = text.lower()
-        return any(phrase in text_lower for phrase in authority_phrases)
+        return 'authority' in self._classify_all(text)
     
     def _personal_anecdote(self, text: str) -> bool:
         """Check if text contains personal anecdotes"""
-        anecdote_phrases = ['i know someone', 'my friend', 'my family', 'happened to me', 'i saw', 'i heard']
-        text_lower = text.lower()
-        return any(phrase in text_lower for phrase in anecdote_phrases)
+        return 'anecdote' in self._classify_all(text)
     
     def format_bluesky_reply(self, fact_check_result: Dict[str, Any]) -> str:
         """
@@ -751,27 +952,22 @@ class MediaProcessingBot:
         Returns:
             Formatted string for Bluesky reply
         """
-        if "error" in fact_check_result:
-            return f"Error: {fact_check_result['error']}"
+        error = fact_check_result.get("error")
+        if error is not None:
+            return f"Error: {error}"
             
         # Check if status is NO_CLAIMS
         if fact_check_result.get("status") == "NO_CLAIMS":
-            return "Thanks for the mention! I didn't find any specific factual claims to verify in this post."
+            return _NO_CLAIMS_MESSAGE
             
         # Use the conversational response from the model and clean up citations
-        response = fact_check_result.get("response", "Unable to generate fact-check response")
+        response = fact_check_result.get("response") or _NO_FACT_CHECK_RESPONSE
         
         # Remove all types of numbered citations in brackets including preceding space
-        import re
-        # Remove patterns like [1], [2, 3], [i], [ii], [a], [b], etc. with optional preceding space
-        response = re.sub(r'\s*\[\s*[a-zA-Z0-9]+(?:\s*,\s*[a-zA-Z0-9]+)*\s*\]', '', response)
-        
-        # Also clean up the response during JSON processing before it gets here
-        if isinstance(fact_check_result.get("response"), str):
-            fact_check_result["response"] = re.sub(r'\s*\[\s*[a-zA-Z0-9]+(?:\s*,\s*[a-zA-Z0-9]+)*\s*\]', '', fact_check_result["response"])
+        response = _CITATION_RE.sub('', response)
         
         # Remove quotation marks
-        response = response.replace('"', '').replace("'", "")
+        response = response.translate(_QUOTE_STRIP)
         
         return response
     
@@ -785,11 +981,12 @@ class MediaProcessingBot:
         Returns:
             Formatted string for Bluesky reply
         """
-        if "error" in transcription_result:
-            return f"{transcription_result['error']}"
+        error = transcription_result.get("error")
+        if error is not None:
+            return f"{error}"
             
         # Use the response from the structured JSON output
-        response = transcription_result.get("response", "Unable to process media content")
+        response = transcription_result.get("response") or _NO_TRANSCRIPTION_RESPONSE
         
         # Clean up any unwanted characters but keep the response natural
         response = response.strip()
@@ -842,21 +1039,14 @@ class MediaProcessingBot:
             return []
         
         try:
-            dataset_id = os.getenv('BIGQUERY_DATASET_ID', 'dataset')
-            table_id = os.getenv('BIGQUERY_TABLE_ID', 'fact-checker')
-            project_id = os.getenv('BIGQUERY_PROJECT_ID')
-            
-            query = f"""
-            SELECT sources 
-            FROM `{project_id}.{dataset_id}.{table_id}` 
-            WHERE id = '{fact_check_id}'
-            LIMIT 1
-            """
-            
-            result = self.bq_client.query(query)
+            rows = self.bq_client.query_rows(
+                self._sources_by_id_sql,
+                query_parameters=[bigquery.ScalarQueryParameter('fact_check_id', 'STRING', fact_check_id)],
+                max_results=1
+            )
             
-            if len(result) > 0 and 'sources' in result.columns:
-                sources_json = result.iloc[0]['sources']
+            if rows:
+                sources_json = rows[0]['sources']
                 if sources_json:
                     try:
                         return json.loads(sources_json)
@@ -866,7 +1056,7 @@ class MediaProcessingBot:
                         try:
                             return json.loads(cleaned_json)
                         except json.JSONDecodeError:
-                            logger.debug(f"Could not parse sources JSON: {sources_json[:50]}")
+                            logger.debug("Could not parse sources JSON: %s", sources_json[:50])
                             return []
             
             return []
@@ -888,95 +1078,93 @@ class MediaProcessingBot:
         if not sources:
             return "No sources found for this fact-check."
         
+        # Build the full format, bailing out to the short one as soon as it overflows
         response_parts = ["Sources for this fact-check:"]
+        total_length = len(response_parts[0])
         
         for i, source in enumerate(sources[:5], 1):  # Limit to 5 sources
             title = source.get('title', 'Unknown Article')
             publisher = source.get('publisher', 'Unknown Publisher')
             
             source_line = f"{i}. {title} - {publisher}"
+            total_length += len(source_line) + 2  # "\n\n" separator
+            if total_length > 300:  # Bluesky 300 char limit
+                break
             response_parts.append(source_line)
+        else:
+            return "\n\n".join(response_parts)
+        
+        # Too long - use shorter format
+        response_parts = ["Sources:"]
+        for i, source in enumerate(sources[:3], 1):
+            title = source.get('title', f'Source {i}')
+            publisher = source.get('publisher', '')
+            if publisher:
+                response_parts.append(f"{i}. {title[:40]}... - {publisher}")
+            else:
+                response_parts.append(f"{i}. {title[:50]}...")
         
         full_response = "\n\n".join(response_parts)
         
-        # Truncate if too long for Bluesky (300 char limit)
-        if len(full_response) > 300:
-            # Try shorter format
-            response_parts = ["Sources:"]
-            for i, source in enumerate(sources[:3], 1):
-                title = source.get('title', f'Source {i}')
-                publisher = source.get('publisher', '')
-                if publisher:
-                    response_parts.append(f"{i}. {title[:40]}... - {publisher}")
-                else:
-                    response_parts.append(f"{i}. {title[:50]}...")
-            
-            full_response = "\n\n".join(response_parts)
-            
-            # Final truncation if still too long
-            if len(full_response) > 280:
-                full_response = full_response[:277] + "..."
+        # Final truncation if still too long
+        if len(full_response) > 280:
+            full_response = full_response[:277] + "..."
+        
+        return full_response
     
     def _manual_json_extraction(self, response_text: str) -> dict:
         """Manual extraction for common JSON patterns when parsing fails"""
-        import re
+        # Single structured pass over the outermost object before falling back to regexes
+        json_object = _extract_json_object(response_text)
+        if json_object:
+            try:
+                parsed = _LENIENT_JSON_DECODER.decode(json_object)
+                if isinstance(parsed, dict) and "response" in parsed and "substantially_accurate" in parsed:
+                    parsed.setdefault("response_character_count", len(parsed["response"]))
+                    parsed.setdefault("sources", [])
+                    return parsed
+            except ValueError as e:
+                logger.debug("Structured extraction failed: %s", e)
         
         # Try to extract key fields manually
         result = {}
         
         # Extract thinking field
-        thinking_match = re.search(r'"thinking":\s*"([^"]+)"', response_text, re.DOTALL)
+        thinking_match = _THINKING_RE.search(response_text)
         if thinking_match:
             result["thinking"] = thinking_match.group(1)
         
         # Extract substantially_accurate
-        accurate_match = re.search(r'"substantially_accurate":\s*(true|false)', response_text)
+        accurate_match = _ACCURATE_RE.search(response_text)
         if accurate_match:
             result["substantially_accurate"] = accurate_match.group(1) == "true"
         
         # Extract category
-        category_match = re.search(r'"category":\s*"([^"]+)"', response_text)
+        category_match = _CATEGORY_RE.search(response_text)
         if category_match:
             result["category"] = category_match.group(1)
         
         # Extract response
-        response_match = re.search(r'"response":\s*"([^"]+)"', response_text, re.DOTALL)
+        response_match = _RESPONSE_RE.search(response_text)
         if response_match:
             result["response"] = response_match.group(1)
             result["response_character_count"] = len(result["response"])
         
-        # Extract sources array (simplified)
-        sources_match = re.search(r'"sources":\s*\[([^\]]+)\]', response_text, re.DOTALL)
+        # Extract sources array one balanced object at a time
+        sources = []
+        sources_match = _SOURCES_ARRAY_RE.search(response_text)
         if sources_match:
-            try:
-                # Try to parse individual source objects
-                sources_content = sources_match.group(1)
-                sources = []
-                
-                # Find individual source objects
-                source_objects = re.findall(r'\{([^}]+)\}', sources_content)
-                for source_obj in source_objects:
-                    source = {}
-                    title_match = re.search(r'"title":\s*"([^"]+)"', source_obj)
-                    if title_match:
-                        source["title"] = title_match.group(1)
-                    
-                    publisher_match = re.search(r'"publisher":\s*"([^"]+)"', source_obj)
-                    if publisher_match:
-                        source["publisher"] = publisher_match.group(1)
-                    
-                    relevance_match = re.search(r'"relevance":\s*"([^"]+)"', source_obj)
-                    if relevance_match:
-                        source["relevance"] = relevance_match.group(1)
-                    
-                    if source:
-                        sources.append(source)
+            for source_obj in _iter_balanced_objects(response_text, sources_match.end()):
+                try:
+                    source = _LENIENT_JSON_DECODER.decode(source_obj)
+                except ValueError:
+                    # Malformed object - fall back to per-field extraction
+                    source = self._extract_source_fields(source_obj)
                 
-                result["sources"] = sources
-            except:
-                result["sources"] = []
-        else:
-            result["sources"] = []
+                if isinstance(source, dict) and source:
+                    sources.append(source)
+        
+        result["sources"] = sources
         
         # Only return if we extracted at least the essential fields
         if "response" in result and "substantially_accurate" in result:
@@ -984,24 +1172,37 @@ class MediaProcessingBot:
         
         return None
     
+    def _extract_source_fields(self, source_obj: str) -> dict:
+        """Regex extraction of known fields from a single malformed source object"""
+        source = {}
+        title_match = _SOURCE_TITLE_RE.search(source_obj)
+        if title_match:
+            source["title"] = title_match.group(1)
+        
+        publisher_match = _SOURCE_PUBLISHER_RE.search(source_obj)
+        if publisher_match:
+            source["publisher"] = publisher_match.group(1)
+        
+        relevance_match = _SOURCE_RELEVANCE_RE.search(source_obj)
+        if relevance_match:
+            source["relevance"] = relevance_match.group(1)
+        
+        return source
+    
     def _reduce_response_length(self, original_response: str) -> str:
         """
         Use length reduction prompt to compress a response while preserving all key information
         """
-        logger.debug(f"Attempting to reduce response length from {len(original_response)} chars")
+        logger.debug("Attempting to reduce response length from %s chars", len(original_response))
         
-        # Load length reduction prompt template
-        length_reduction_prompt_file = "prompt/length_reduction.txt"
-        try:
-            with open(length_reduction_prompt_file, 'r') as f:
-                prompt_template = f.read()
-        except FileNotFoundError:
-            logger.error(f"Length reduction prompt file not found: {length_reduction_prompt_file}")
+        # Length reduction prompt template is loaded at startup
+        if self.length_reduction_template is None:
+            logger.error(f"Length reduction prompt file not found: {_LENGTH_REDUCTION_PROMPT_FILE}")
             # Fallback to simple truncation
-            return original_response[:285] + "..." if len(original_response) > 285 else original_response
+            return _truncate_reply(original_response)
         
         # Format prompt with original response
-        prompt = prompt_template.format(original_response=original_response)
+        prompt = self.length_reduction_template.format(original_response=original_response)
         
         # Query Gemini for length reduction
         try:
@@ -1010,17 +1211,17 @@ class MediaProcessingBot:
             # Clean up the response (remove any extra whitespace/formatting)
             reduced_response = reduced_response.strip()
             
-            logger.debug(f"Response reduced to {len(reduced_response)} chars")
+            logger.debug("Response reduced to %s chars", len(reduced_response))
             
             # Verify it's actually shorter and within limit
-            if len(reduced_response) <= 285 and len(reduced_response) < len(original_response):
+            if len(reduced_response) <= _MAX_REPLY_CHARS and len(reduced_response) < len(original_response):
                 return reduced_response
             else:
-                logger.warning(f"Length reduction failed: {len(reduced_response)} chars (target: 285)")
+                logger.warning(f"Length reduction failed: {len(reduced_response)} chars (target: {_MAX_REPLY_CHARS})")
                 # Fallback to truncation
-                return original_response[:285] + "..." if len(original_response) > 285 else original_response
+                return _truncate_reply(original_response)
                 
         except Exception as e:
             logger.error(f"Error during length reduction: {e}")
             # Fallback to simple truncation
-            return original_response[:285] + "..." if len(original_response) > 285 else original_response
\ No newline at end of file
+            return _truncate_reply(original_response)
\ No newline at end of file
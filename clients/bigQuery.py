@@ -17,6 +17,19 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+_COLUMN_NAME_INVALID_RE = re.compile(r'[^a-zA-Z0-9_]')
+_CONTROL_CHARS_RE = re.compile(r'[\x00-\x1f\x7f-\x9f]')
+
+# Kept textually identical across calls so BigQuery's result cache can serve repeats
+_LAST_PROCESSED_QUERY = """
+            SELECT timestamp
+            FROM `{project_id}.{dataset_id}.{table_id}`
+            WHERE key = 'last_processed_mention'
+            ORDER BY updated_at DESC
+            LIMIT 1
+            """
+_LAST_PROCESSED_CACHE_SECONDS = 30
+
 class Client:
     def __init__(self, credentials_json, project_id):
         """
@@ -30,10 +43,13 @@ class Client:
         self.client = self._build_client()
         self.batch_size = 10000
         
+        # Recently read/written last-processed timestamps: (dataset_id, table_id) -> (timestamp, expires)
+        self._last_processed_cache = {}
+        
         # Track active jobs for cleanup - USE WEAKREFS TO PREVENT REFERENCE CYCLES
         self._active_jobs = weakref.WeakSet()
         
-        self.logger.debug(f"BigQuery API initialized with batch size: {self.batch_size}")
+        self.logger.debug("BigQuery API initialized with batch size: %s", self.batch_size)
     
     def _build_client(self):
         """Build and return the BigQuery client"""
@@ -169,11 +185,11 @@ class Client:
             
             # Apply sanitization to each column
             for col in df_clean.columns:
-                self.logger.debug(f"Sanitizing column: {col}")
+                self.logger.debug("Sanitizing column: %s", col)
                 df_clean[col] = df_clean[col].apply(self._sanitize_cell_value)
             
             # Clean column names for BigQuery
-            df_clean.columns = [re.sub(r'[^a-zA-Z0-9_]', '_', str(col)) for col in df_clean.columns]
+            df_clean.columns = [_COLUMN_NAME_INVALID_RE.sub('_', str(col)) for col in df_clean.columns]
             
             self.logger.info(f"DataFrame sanitization completed")
             return df_clean
@@ -562,18 +578,19 @@ class Client:
         try:
             str_value = str(value)
             # Remove control characters
-            str_value = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', str_value)
+            str_value = _CONTROL_CHARS_RE.sub('', str_value)
             return str_value
         except Exception as e:
             self.logger.warning(f"Failed to convert value {type(value)} to string: {e}")
             return None
     
-    def query(self, sql: str) -> pd.DataFrame:
+    def query(self, sql: str, query_parameters: list = None) -> pd.DataFrame:
         """
         Execute a BigQuery SQL query and return results as DataFrame
         
         Args:
             sql: SQL query string
+            query_parameters: Optional list of bigquery query parameters referenced as @name in sql
             
         Returns:
             DataFrame with query results, empty DataFrame on error
@@ -581,8 +598,12 @@ class Client:
         try:
             self.logger.info(f"Executing BigQuery query")
             
+            job_config = None
+            if query_parameters:
+                job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+            
             # Execute query and convert to DataFrame
-            query_job = self.client.query(sql)
+            query_job = self.client.query(sql, job_config=job_config)
             result_df = query_job.to_dataframe()
             
             self.logger.info(f"Query returned {len(result_df)} rows")
@@ -592,6 +613,35 @@ class Client:
             self.logger.error(f"Query execution failed: {e}")
             return pd.DataFrame()  # Return empty DataFrame on error
     
+    def query_rows(self, sql: str, query_parameters: list = None, max_results: int = None) -> list:
+        """
+        Execute a BigQuery SQL query and return raw result rows without building a DataFrame
+        
+        Args:
+            sql: SQL query string
+            query_parameters: Optional list of bigquery query parameters referenced as @name in sql
+            max_results: Optional cap on the number of rows fetched
+            
+        Returns:
+            List of bigquery Row objects, empty list on error
+        """
+        try:
+            self.logger.info("Executing BigQuery row query")
+            
+            job_config = None
+            if query_parameters:
+                job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+            
+            query_job = self.client.query(sql, job_config=job_config)
+            rows = list(query_job.result(max_results=max_results))
+            
+            self.logger.info(f"Query returned {len(rows)} rows")
+            return rows
+            
+        except Exception as e:
+            self.logger.error(f"Query execution failed: {e}")
+            return []
+    
     def create_timestamp_table(self, dataset_id: str, table_id: str) -> bool:
         """
         Create a table to store the last processed timestamp
@@ -649,19 +699,18 @@ class Client:
         Returns:
             Last processed timestamp or epoch if not found
         """
+        cached = self._last_processed_cache.get((dataset_id, table_id))
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        
         try:
-            query = f"""
-            SELECT timestamp
-            FROM `{self.project_id}.{dataset_id}.{table_id}`
-            WHERE key = 'last_processed_mention'
-            ORDER BY updated_at DESC
-            LIMIT 1
-            """
+            query = _LAST_PROCESSED_QUERY.format(project_id=self.project_id, dataset_id=dataset_id, table_id=table_id)
             
-            result = self.query(query)
+            rows = self.query_rows(query, max_results=1)
             
-            if len(result) > 0:
-                timestamp = pd.to_datetime(result.iloc[0]['timestamp'], utc=True)
+            if rows:
+                timestamp = pd.to_datetime(rows[0]['timestamp'], utc=True)
+                self._remember_last_processed(dataset_id, table_id, timestamp)
                 self.logger.info(f"Retrieved last processed timestamp: {timestamp}")
                 return timestamp
             else:
@@ -675,6 +724,11 @@ class Client:
             # Return epoch time on error
             return pd.Timestamp('1970-01-01', tz='UTC')
     
+    def _remember_last_processed(self, dataset_id: str, table_id: str, timestamp: pd.Timestamp):
+        """Serve this timestamp for the next few seconds without querying"""
+        expires = time.monotonic() + _LAST_PROCESSED_CACHE_SECONDS
+        self._last_processed_cache[(dataset_id, table_id)] = (timestamp, expires)
+    
     def update_last_processed_timestamp(self, dataset_id: str, table_id: str, timestamp: pd.Timestamp) -> bool:
         """
         Update the last processed timestamp
@@ -695,7 +749,6 @@ class Client:
             WHERE key = 'last_processed_mention'
             """
             
-            from google.cloud import bigquery
             job_config = bigquery.QueryJobConfig(
                 query_parameters=[
                     bigquery.ScalarQueryParameter("new_timestamp", "TIMESTAMP", timestamp)
@@ -718,6 +771,7 @@ class Client:
                 
                 self.append(new_data, dataset_id, table_id, create_if_not_exists=False)
             
+            self._remember_last_processed(dataset_id, table_id, pd.to_datetime(timestamp, utc=True))
             self.logger.info(f"Updated last processed timestamp to: {timestamp}")
             return True
             
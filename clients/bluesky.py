@@ -1,164 +1,390 @@
+import os
 import re
+import functools
+import time
+import sqlite3
+import threading
+import orjson
 import requests
 import logging
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from cachetools import LRUCache, TTLCache
 from atproto import Client as AtprotoClient, models
 from typing import Optional, Dict, Any, List
 
 logger = logging.getLogger(__name__)
 
+# Bluesky web URL for a post: https://bsky.app/profile/<handle>/post/<rkey>
+_BSKY_URL_PREFIX = 'https://bsky.app/profile/'
+_BSKY_URL_RE = re.compile(r'https://bsky\.app/profile/([^/]+)/post/([^/?#]+)')
+_RESOLVE_HANDLE_URL = "https://public.api.bsky.app/xrpc/com.atproto.identity.resolveHandle"
+_RESOLVE_HANDLE_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+_DID_CACHE_TTL = 3600  # seconds; soft expiry so DID rotations are eventually picked up
+_RATE_LIMIT_MAX_WAIT = 60  # seconds; never stall the bot longer than this on an exhausted window
+
+# Request param models used on every call
+_GetPostsParams = models.AppBskyFeedGetPosts.Params
+_GetPostThreadParams = models.AppBskyFeedGetPostThread.Params
+_ListNotificationsParams = models.AppBskyNotificationListNotifications.Params
+_ReplyRef = models.AppBskyFeedPost.ReplyRef
+_GET_POSTS_MAX_URIS = 25  # getPosts limit per request
+
+# External-link suffixes that point straight at playable media
+_VIDEO_EXTS = frozenset({'.mp4', '.mov', '.avi'})
+_AUDIO_EXTS = frozenset({'.mp3', '.wav', '.m4a'})
+
+
+# Params models validate on construction; most calls repeat the same few shapes
+@functools.lru_cache(maxsize=8)
+def _notification_params(limit: int):
+    return _ListNotificationsParams(limit=limit)
+
+
+@functools.lru_cache(maxsize=64)
+def _thread_params(uri: str, depth: int, parent_height: int):
+    return _GetPostThreadParams(uri=uri, depth=depth, parentHeight=parent_height)
+
 
 class Client:
     """Bluesky client for media processing (images, audio, video)"""
     
-    def __init__(self, username: str, password: str):
+    def __init__(self, username: str, password: str, did_cache_path: Optional[str] = "did_cache.db",
+                 session_path: Optional[str] = None):
         self.client = AtprotoClient()
         self.authenticated = False
+        
+        # Reuse a saved session across restarts instead of a password login each time;
+        # atproto refreshes the tokens itself and the callback keeps the file current
+        self._session_path = session_path
+        self._session_owner = username
+        if session_path:
+            self.client.on_session_change(self._save_session)
+        
         try:
-            self.client.login(username, password)
+            if not self._resume_session():
+                self.client.login(username, password)
             self.authenticated = True
         except Exception as e:
             logger.error(f"Bluesky login failed: {e}")
             raise
-    
-    def url_to_uri(self, url: str) -> Optional[str]:
-        """Convert Bluesky URL to AT URI"""
-        match = re.match(r'https://bsky\.app/profile/([^/]+)/post/([^/?#]+)', url)
-        if not match:
-            logger.debug("URL regex match failed")
-            return None
         
-        handle, rkey = match.groups()
+        # Cache the bot's own handle once instead of re-reading it per request
+        self._bot_handle = getattr(getattr(self.client, 'me', None), 'handle', None) or "bskyscribe.bsky.social"
+        self._bot_at = f"@{self._bot_handle}"
+        
+        # Pooled HTTP session and per-client handle -> DID cache for url_to_uri
+        self._session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=frozenset(['GET']))
+        self._session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry))
+        self._rate_limit_reset = 0.0  # epoch seconds until which resolveHandle's window is exhausted
+        self._did_cache = TTLCache(maxsize=4096, ttl=_DID_CACHE_TTL)
+        self._did_cache_lock = threading.Lock()
+        
+        # Login already told us our own DID
+        self.bot_did = getattr(getattr(self.client, 'me', None), 'did', None)
+        if self.bot_did:
+            self._did_cache[self._bot_handle] = self.bot_did
+        
+        # Resolutions survive restarts in a small sqlite file (None disables)
+        self._did_db = None
+        if did_cache_path:
+            try:
+                self._did_db = sqlite3.connect(did_cache_path, check_same_thread=False)
+                self._did_db.execute("PRAGMA journal_mode=WAL")
+                self._did_db.execute("PRAGMA synchronous=NORMAL")
+                self._did_db.execute(
+                    "CREATE TABLE IF NOT EXISTS did (handle TEXT PRIMARY KEY, did TEXT NOT NULL, expires REAL NOT NULL)"
+                )
+                self._did_db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"DID cache unavailable, resolving handles in memory only: {e}")
+                self._did_db = None
+        
+        # Short-lived post views so a mention fetched for its text is reused when replying
+        self._post_cache = TTLCache(maxsize=256, ttl=120)
+        self._post_cache_lock = threading.Lock()
+        
+        # Thread views (direct replies + one parent) shared by the duplicate check and parent lookup
+        self._thread_cache = TTLCache(maxsize=128, ttl=60)
+        self._thread_cache_lock = threading.Lock()
+        
+        # Posts this client has replied to; the bot is the only writer of its own replies
+        self._replied_uris = LRUCache(maxsize=10000)
+        self._replied_uris_lock = threading.Lock()
+    
+    def _resume_session(self) -> bool:
+        """Log in from the saved session string, if there is a usable one for this account"""
+        if not self._session_path or not os.path.exists(self._session_path):
+            return False
+        try:
+            # First line names the account the session was saved for; a changed username means a fresh login
+            with open(self._session_path, 'r') as f:
+                owner, _, session_string = f.read().partition('\n')
+            if owner != self._session_owner or not session_string.strip():
+                logger.info("Saved Bluesky session belongs to another account, logging in with password")
+                return False
+            self.client.login(session_string=session_string.strip())
+            return True
+        except Exception as e:
+            logger.warning(f"Saved Bluesky session unusable, logging in with password: {e}")
+            return False
+    
+    def _save_session(self, *_):
+        """Persist the current session string (owner-readable only)"""
+        try:
+            os.makedirs(os.path.dirname(self._session_path) or '.', exist_ok=True)
+            fd = os.open(self._session_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            # O_CREAT's mode only applies to new files, so tighten an existing one too
+            os.fchmod(fd, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                f.write(f"{self._session_owner}\n{self.client.export_session_string()}")
+        except Exception as e:
+            logger.debug("Session save failed: %s", e)
+    
+    def close(self):
+        """Release pooled HTTP connections and the DID cache file"""
+        self._session.close()
+        if self._did_db is not None:
+            with self._did_cache_lock:
+                self._did_db.close()
+                self._did_db = None
+    
+    def _fetch_did(self, handle: str) -> str:
+        """Resolve a handle to its DID (raises on failure so misses are not cached)"""
+        wait = self._rate_limit_reset - time.time()
+        if wait > 0:
+            time.sleep(min(wait, _RATE_LIMIT_MAX_WAIT))
         
+        response = self._session.get(_RESOLVE_HANDLE_URL, params={"handle": handle}, timeout=_RESOLVE_HANDLE_TIMEOUT)
+        self._track_rate_limit(response.headers)
+        if response.status_code != 200:
+            raise ValueError(f"Handle resolution failed: {response.text}")
+        return orjson.loads(response.content)["did"]
+    
+    def _track_rate_limit(self, headers):
+        """Note when the rate-limit window is exhausted so the next call waits for the reset"""
+        if headers.get('RateLimit-Remaining') != '0':
+            return
+        try:
+            self._rate_limit_reset = float(headers['RateLimit-Reset'])
+        except (KeyError, ValueError):
+            return
+        logger.warning(f"resolveHandle rate limit exhausted, pausing until {self._rate_limit_reset:.0f}")
+    
+    def _resolve_handle(self, handle: str) -> str:
+        """Resolve a handle to its DID, reusing a recent resolution of the same handle"""
+        with self._did_cache_lock:
+            did = self._did_cache.get(handle)
+            if did is None:
+                did = self._load_did(handle)
+                if did is not None:
+                    self._did_cache[handle] = did
+        if did is None:
+            did = self._fetch_did(handle)
+            with self._did_cache_lock:
+                self._did_cache[handle] = did
+                self._store_did(handle, did)
+        return did
+    
+    def _load_did(self, handle: str) -> Optional[str]:
+        """Look up an unexpired persisted resolution (caller holds the DID cache lock)"""
+        if self._did_db is None:
+            return None
+        try:
+            row = self._did_db.execute(
+                "SELECT did FROM did WHERE handle = ? AND expires > ?", (handle, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.debug("DID cache read failed: %s", e)
+            return None
+        return row[0] if row else None
+    
+    def _store_did(self, handle: str, did: str):
+        """Persist a resolution (caller holds the DID cache lock)"""
+        if self._did_db is None:
+            return
         try:
-            response = requests.get(
-                f"https://public.api.bsky.app/xrpc/com.atproto.identity.resolveHandle",
-                params={"handle": handle}
+            self._did_db.execute(
+                "INSERT OR REPLACE INTO did (handle, did, expires) VALUES (?, ?, ?)",
+                (handle, did, time.time() + _DID_CACHE_TTL)
             )
-            if response.status_code != 200:
-                logger.debug(f"Handle resolution failed: {response.text}")
+            self._did_db.commit()
+        except sqlite3.Error as e:
+            logger.debug("DID cache write failed: %s", e)
+    
+    def url_to_uri(self, url: str) -> Optional[str]:
+        """Convert Bluesky URL to AT URI"""
+        # Plain post URLs split without the regex engine; anything with a query/fragment falls through
+        handle, sep, rkey = url[len(_BSKY_URL_PREFIX):].partition('/post/')
+        if not (url.startswith(_BSKY_URL_PREFIX) and sep and handle and rkey
+                and '/' not in handle and '/' not in rkey and '?' not in rkey and '#' not in rkey):
+            match = _BSKY_URL_RE.match(url)
+            if not match:
+                logger.debug("URL regex match failed")
                 return None
-            did = response.json()["did"]
+            handle, rkey = match.groups()
+        
+        try:
+            did = self._resolve_handle(handle)
             uri = f"at://{did}/app.bsky.feed.post/{rkey}"
             return uri
         except Exception as e:
-            logger.debug(f"URL to URI conversion failed: {e}")
+            logger.debug("URL to URI conversion failed: %s", e)
             return None
     
+    def _coerce_uri(self, url_or_uri: str) -> Optional[str]:
+        """Return an AT URI for either a bsky.app URL or an AT URI"""
+        if url_or_uri.startswith("at://"):
+            return url_or_uri
+        if url_or_uri.startswith("https://"):
+            return self.url_to_uri(url_or_uri)
+        return url_or_uri
+    
     def get_post_text(self, url_or_uri: str) -> Optional[str]:
         """Get the text content of a single post"""
-        if url_or_uri.startswith("https://"):
-            uri = self.url_to_uri(url_or_uri)
-            if not uri:
-                return None
-        else:
-            uri = url_or_uri
+        uri = self._coerce_uri(url_or_uri)
+        if not uri:
+            return None
         
         try:
-            from atproto import models
-            params = models.AppBskyFeedGetPosts.Params(uris=[uri])
-            response = self.client.app.bsky.feed.get_posts(params=params)
-            if response.posts:
-                return response.posts[0].record.text
+            post = self._get_post(uri)
+            if post:
+                return post.record.text
             return None
         except Exception as e:
             return None
     
+    def _get_post(self, uri: str):
+        """Fetch a single post view, reusing a recent fetch of the same URI"""
+        return self.get_posts_batch([uri]).get(uri)
+    
+    def get_posts_batch(self, uris: List[str]) -> Dict[str, Any]:
+        """Fetch post views for many URIs in as few getPosts calls as possible, keyed by URI"""
+        posts = {}
+        missing = []
+        with self._post_cache_lock:
+            for uri in dict.fromkeys(uris):
+                post = self._post_cache.get(uri)
+                if post is None:
+                    missing.append(uri)
+                else:
+                    posts[uri] = post
+        
+        fetched = []
+        for i in range(0, len(missing), _GET_POSTS_MAX_URIS):
+            fetched.extend(self._fetch_posts(missing[i:i + _GET_POSTS_MAX_URIS]))
+        
+        for post in fetched:
+            self._remember_post(post.uri, post)
+            posts[post.uri] = post
+        
+        # Handle-form AT URIs come back under the author's DID; key those by the URI the caller asked for
+        unmatched = [uri for uri in missing if uri not in posts]
+        if unmatched:
+            by_handle = {(post.author.handle, post.uri[len("at://"):].partition('/')[2]): post for post in fetched}
+            for uri in unmatched:
+                authority, _, path = uri[len("at://"):].partition('/')
+                post = by_handle.get((authority, path))
+                if post is not None:
+                    self._remember_post(uri, post)
+                    posts[uri] = post
+        return posts
+    
+    def _fetch_posts(self, uris: List[str]) -> list:
+        """Issue one getPosts call"""
+        params = _GetPostsParams(uris=uris)
+        return self.client.app.bsky.feed.get_posts(params=params).posts
+    
+    def _get_thread(self, uri: str):
+        """Fetch a post's thread with its direct replies and one parent, reusing a recent fetch"""
+        with self._thread_cache_lock:
+            thread_view = self._thread_cache.get(uri)
+        if thread_view is None:
+            # Direct replies for the duplicate check, one parent up for the media lookup
+            params = _thread_params(uri, 1, 1)
+            thread_view = self.client.app.bsky.feed.get_post_thread(params=params).thread
+            with self._thread_cache_lock:
+                self._thread_cache[uri] = thread_view
+        return thread_view
+    
+    def _remember_post(self, uri: str, post):
+        """Cache a post view obtained as a side effect of another request"""
+        with self._post_cache_lock:
+            self._post_cache[uri] = post
+    
     def get_parent_post_with_media(self, url_or_uri: str) -> Optional[Dict[str, Any]]:
         """Get the parent post (one reply up) with media attachments"""
-        # Convert URL to URI if needed
-        if url_or_uri.startswith("https://"):
-            mention_uri = self.url_to_uri(url_or_uri)
-            if not mention_uri:
-                return None
-        else:
-            mention_uri = url_or_uri
+        mention_uri = self._coerce_uri(url_or_uri)
+        if not mention_uri:
+            return None
             
         try:
-            from atproto import models
-            
-            # Get the thread to find parent
-            params = models.AppBskyFeedGetPostThread.Params(
-                uri=mention_uri,
-                depth=0,  # No replies needed
-                parentHeight=1  # Just one parent up
-            )
-            thread = self.client.app.bsky.feed.get_post_thread(params=params)
+            # Get the thread to find parent (usually already fetched by the duplicate check)
+            thread_view = self._get_thread(mention_uri)
             
-            # Get parent post if it exists
-            if hasattr(thread.thread, 'parent') and thread.thread.parent:
-                parent = thread.thread.parent
-                if hasattr(parent, 'post'):
-                    post = parent.post
-                    
-                    # Skip bot's own posts
-                    bot_handle = self.client.me.handle if hasattr(self.client, 'me') else "bskyscribe.bsky.social"
-                    if post.author.handle == bot_handle:
-                        logger.debug("Skipping bot's own post")
-                        return None
-                    
-                    # Extract media attachments
-                    media_items = []
-                    if hasattr(post.record, 'embed') and post.record.embed:
-                        media_items = self._extract_media_from_embed(post.record.embed, post.author.did)
-                    
-                    # Return error if no media found
-                    if not media_items:
-                        return {
-                            "error": "No images, videos, or audio found in this post"
-                        }
-                    
-                    return {
-                        "uri": post.uri,
-                        "author": f"@{post.author.handle}",
-                        "text": post.record.text,
-                        "created_at": getattr(post.record, 'createdAt', ''),
-                        "media": media_items
-                    }
+            # Get parent post if it exists (missing, not-found and blocked parents have no .post)
+            try:
+                post = thread_view.parent.post
+            except AttributeError:
+                post = None
             
-            # If no parent, return the mention post itself
-            params = models.AppBskyFeedGetPosts.Params(uris=[mention_uri])
-            response = self.client.app.bsky.feed.get_posts(params=params)
-            
-            if response.posts:
-                post = response.posts[0]
-                
-                # Extract media attachments
-                media_items = []
-                if hasattr(post.record, 'embed') and post.record.embed:
-                    media_items = self._extract_media_from_embed(post.record.embed, post.author.did)
-                
-                # Return error if no media found
-                if not media_items:
-                    return {
-                        "error": "No images, videos, or audio found in this post"
-                    }
+            if post is not None:
+                # Skip bot's own posts
+                if post.author.handle == self._bot_handle:
+                    logger.debug("Skipping bot's own post")
+                    return None
                 
-                return {
-                    "uri": mention_uri,
-                    "author": f"@{post.author.handle}",
-                    "text": post.record.text,
-                    "created_at": getattr(post.record, 'createdAt', ''),
-                    "media": media_items
-                }
+                return self._extract_media_post(post, post.uri)
+            
+            # If no parent, return the mention post itself - already in the thread response
+            post = getattr(thread_view, 'post', None)
+            if post is not None:
+                return self._extract_media_post(post, mention_uri)
             
             return None
             
         except Exception as e:
-            logger.debug(f"Parent post retrieval failed: {e}")
+            logger.debug("Parent post retrieval failed: %s", e)
             return None
     
+    def _extract_media_post(self, post, uri: str) -> Dict[str, Any]:
+        """Build the media post payload from a post view, or an error if it has no media"""
+        record = post.record
+        author = post.author
+        
+        # Extract media attachments
+        media_items = []
+        embed = getattr(record, 'embed', None)
+        if embed:
+            media_items = self._extract_media_from_embed(embed, author.did)
+        
+        # Return error if no media found
+        if not media_items:
+            return {
+                "error": "No images, videos, or audio found in this post"
+            }
+        
+        return {
+            "uri": uri,
+            "author": f"@{author.handle}",
+            "text": record.text,
+            "created_at": getattr(record, 'createdAt', ''),
+            "media": media_items
+        }
+    
     def get_notifications(self, limit: int = 50) -> list:
         """Get recent notifications (mentions, replies, etc.)"""
         if not self.authenticated:
             return []
         
         try:
-            from atproto import models
-            params = models.AppBskyNotificationListNotifications.Params(limit=limit)
+            params = _notification_params(limit)
             response = self.client.app.bsky.notification.list_notifications(params=params)
             return response.notifications
         except Exception as e:
-            logger.debug(f"Notifications retrieval failed: {e}")
+            logger.debug("Notifications retrieval failed: %s", e)
             return []
     
     def _extract_media_from_embed(self, embed, author_did: str) -> List[Dict[str, Any]]:
@@ -167,54 +393,64 @@ class Client:
         
         try:
             # Handle record with media (app.bsky.embed.recordWithMedia)
-            if hasattr(embed, 'media') and embed.media:
+            media = getattr(embed, 'media', None)
+            if media:
                 # Recursively extract media from the media part
-                media_items.extend(self._extract_media_from_embed(embed.media, author_did))
+                media_items.extend(self._extract_media_from_embed(media, author_did))
             
             # Handle images (app.bsky.embed.images)
-            if hasattr(embed, 'images') and embed.images:
-                for image in embed.images:
-                    if hasattr(image, 'image') and hasattr(image.image, 'ref'):
+            images = getattr(embed, 'images', None)
+            if images:
+                for image in images:
+                    blob = getattr(image, 'image', None)
+                    ref = getattr(blob, 'ref', None)
+                    if ref is not None:
                         # Convert blob ref to URL
-                        blob_url = f"https://bsky.social/xrpc/com.atproto.sync.getBlob?did={author_did}&cid={image.image.ref.link}"
+                        link = ref.link
+                        blob_url = f"https://bsky.social/xrpc/com.atproto.sync.getBlob?did={author_did}&cid={link}"
                         media_items.append({
                             'type': 'image',
                             'url': blob_url,
                             'alt_text': getattr(image, 'alt', ''),
-                            'mime_type': getattr(image.image, 'mime_type', ''),
-                            'size': getattr(image.image, 'size', 0),
-                            'ref': image.image.ref.link
+                            'mime_type': getattr(blob, 'mime_type', ''),
+                            'size': getattr(blob, 'size', 0),
+                            'ref': link
                         })
             
             # Handle videos (app.bsky.embed.video)
-            if hasattr(embed, 'video') and embed.video:
-                video = embed.video
+            video = getattr(embed, 'video', None)
+            if video:
                 # Videos are stored as blobs like images
-                if hasattr(video, 'ref'):
-                    video_url = f"https://bsky.social/xrpc/com.atproto.sync.getBlob?did={author_did}&cid={video.ref.link}"
+                ref = getattr(video, 'ref', None)
+                playlist = getattr(video, 'playlist', None)
+                if ref is not None:
+                    link = ref.link
+                    video_url = f"https://bsky.social/xrpc/com.atproto.sync.getBlob?did={author_did}&cid={link}"
                     media_items.append({
                         'type': 'video',
                         'url': video_url,
                         'mime_type': getattr(video, 'mime_type', ''),
                         'size': getattr(video, 'size', 0),
-                        'ref': video.ref.link
+                        'ref': link
                     })
                 # Handle playlist format if it exists
-                elif hasattr(video, 'playlist'):
+                elif playlist is not None:
                     media_items.append({
                         'type': 'video',
-                        'url': video.playlist,
+                        'url': playlist,
                         'thumbnail': getattr(video, 'thumbnail', '')
                     })
             
             # Handle external links that might contain media
-            if hasattr(embed, 'external') and embed.external:
-                external = embed.external
-                if hasattr(external, 'uri'):
+            external = getattr(embed, 'external', None)
+            if external:
+                url = getattr(external, 'uri', None)
+                if url is not None:
                     # Check if external link is a media URL
-                    url = external.uri
-                    if any(url.lower().endswith(ext) for ext in ['.mp4', '.mov', '.avi', '.mp3', '.wav', '.m4a']):
-                        media_type = 'video' if any(url.lower().endswith(ext) for ext in ['.mp4', '.mov', '.avi']) else 'audio'
+                    _, dot, suffix = url.lower().rpartition('.')
+                    ext = dot + suffix
+                    media_type = 'video' if ext in _VIDEO_EXTS else 'audio' if ext in _AUDIO_EXTS else None
+                    if media_type:
                         media_items.append({
                             'type': media_type,
                             'url': url,
@@ -223,7 +459,7 @@ class Client:
                         })
                         
         except Exception as e:
-            logger.debug(f"Media extraction failed: {e}")
+            logger.debug("Media extraction failed: %s", e)
         
         return media_items
     
@@ -232,92 +468,120 @@ class Client:
         if not self.authenticated:
             return []
         
-        if post_url_or_uri.startswith("https://"):
-            post_uri = self.url_to_uri(post_url_or_uri)
-            if not post_uri:
-                return []
-        else:
-            post_uri = post_url_or_uri
+        post_uri = self._coerce_uri(post_url_or_uri)
+        if not post_uri:
+            return []
         
         try:
-            from atproto import models
-            params = models.AppBskyFeedGetPostThread.Params(
-                uri=post_uri,
-                depth=1,  # Only get direct replies
-                parentHeight=0  # Don't get parent context
-            )
+            # Only direct replies, no parent context
+            params = _thread_params(post_uri, 1, 0)
             response = self.client.app.bsky.feed.get_post_thread(params=params)
             
             replies = []
-            if hasattr(response.thread, 'replies') and response.thread.replies:
-                for reply in response.thread.replies:
-                    if hasattr(reply, 'post') and hasattr(reply.post, 'author'):
-                        replies.append({
-                            'uri': reply.post.uri,
-                            'author_handle': reply.post.author.handle,
-                            'author_did': reply.post.author.did,
-                            'text': getattr(reply.post.record, 'text', ''),
-                            'created_at': getattr(reply.post.record, 'createdAt', '')
-                        })
+            append = replies.append
+            for reply in getattr(response.thread, 'replies', None) or []:
+                try:
+                    post = reply.post
+                    author = post.author
+                except AttributeError:
+                    continue  # Not-found or blocked reply
+                
+                record = post.record
+                append({
+                    'uri': post.uri,
+                    'author_handle': author.handle,
+                    'author_did': author.did,
+                    'text': getattr(record, 'text', ''),
+                    'created_at': getattr(record, 'createdAt', '')
+                })
             
             return replies
             
         except Exception as e:
-            logger.debug(f"Post replies retrieval failed: {e}")
+            logger.debug("Post replies retrieval failed: %s", e)
             return []
     
-    def has_bot_already_replied(self, post_url_or_uri: str, bot_handle: str) -> bool:
-        """Check if the bot has already replied to this post"""
+    def has_bot_already_replied(self, post_url_or_uri: str, bot_handle=None) -> bool:
+        """Check if the bot (a handle, or a collection of handles; defaults to our own) has already replied to this post"""
+        if not self.authenticated:
+            return False
+        
+        post_uri = self._coerce_uri(post_url_or_uri)
+        if not post_uri:
+            return False
+        
+        if bot_handle is None:
+            bot_handle = self._bot_handle
+        bot_handles = frozenset((bot_handle,)) if isinstance(bot_handle, str) else frozenset(bot_handle)
+        
+        # Known locally without a network call
+        if self._bot_handle in bot_handles:
+            with self._replied_uris_lock:
+                if post_uri in self._replied_uris:
+                    logger.debug("Already replied from this process")
+                    return True
+        
         try:
-            replies = self.get_post_replies(post_url_or_uri)
-            logger.debug(f"Found {len(replies)} replies")
+            thread_view = self._get_thread(post_uri)
+            
+            # The thread carries the post itself, so a following get_post_text needs no extra round-trip
+            post = getattr(thread_view, 'post', None)
+            if post is not None:
+                self._remember_post(post_uri, post)
             
-            # Check if any reply is from the bot
+            # Stop at the first bot reply without materializing the rest
+            replies = getattr(thread_view, 'replies', None) or []
+            logger.debug("Found %d replies", len(replies))
             for reply in replies:
-                if reply['author_handle'] == bot_handle:
-                    logger.debug(f"Found existing bot reply")
+                try:
+                    handle = reply.post.author.handle
+                except AttributeError:
+                    continue  # Not-found or blocked reply
+                if handle in bot_handles:
+                    logger.debug("Found existing bot reply")
                     return True
             return False
             
         except Exception as e:
-            logger.debug(f"Bot reply check failed: {e}")
+            logger.debug("Bot reply check failed: %s", e)
             # Return False on error to avoid blocking legitimate posts
             return False
 
-    def post_reply(self, parent_url_or_uri: str, text: str) -> bool:
-        """Post a reply to a post"""
+    def post_reply(self, parent_url_or_uri: str, text: str, parent_post=None) -> bool:
+        """Post a reply to a post (pass parent_post if the caller already fetched it)"""
         if not self.authenticated:
             return False
         
-        if parent_url_or_uri.startswith("https://"):
-            parent_uri = self.url_to_uri(parent_url_or_uri)
-            if not parent_uri:
-                return False
-        else:
-            parent_uri = parent_url_or_uri
-        
         try:
             # Get parent post for reply refs
-            from atproto import models
-            params = models.AppBskyFeedGetPosts.Params(uris=[parent_uri])
-            parent_response = self.client.app.bsky.feed.get_posts(params=params)
-            parent_post = parent_response.posts[0]
+            if parent_post is None:
+                parent_uri = self._coerce_uri(parent_url_or_uri)
+                if not parent_uri:
+                    return False
+                
+                parent_post = self._get_post(parent_uri)
+                if parent_post is None:
+                    logger.error("Reply posting failed: parent post not found")
+                    return False
+            
             parent_ref = models.create_strong_ref(parent_post)
             
             # Check if parent is in a thread
-            if hasattr(parent_post.record, 'reply') and parent_post.record.reply:
-                root_ref = parent_post.record.reply.root
-            else:
-                root_ref = parent_ref
+            parent_reply = getattr(parent_post.record, 'reply', None)
+            root_ref = parent_reply.root if parent_reply else parent_ref
             
             # Create reply
-            reply_to = models.AppBskyFeedPost.ReplyRef(parent=parent_ref, root=root_ref)
+            reply_to = _ReplyRef(parent=parent_ref, root=root_ref)
             response = self.client.send_post(text=text, reply_to=reply_to)
             
+            # The cached thread no longer reflects this post's replies
+            with self._thread_cache_lock:
+                self._thread_cache.pop(parent_ref.uri, None)
+            with self._replied_uris_lock:
+                self._replied_uris[parent_ref.uri] = True
+            
             # Return the URI of the posted reply
-            if hasattr(response, 'uri'):
-                return response.uri
-            return True  # Fallback for compatibility
+            return getattr(response, 'uri', True)  # True fallback for compatibility
             
         except Exception as e:
             logger.error(f"Reply posting failed: {e}")
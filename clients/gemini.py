@@ -1,24 +1,158 @@
 import time
+import json
+import hashlib
+import sqlite3
+import threading
 import requests
 import io
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 from google import genai
 from google.genai import types
 
+_MAX_ACTIVATION_WAIT = 60  # seconds to wait for an uploaded file to become ACTIVE
+
+
+class _TokenBucket:
+    """Thread-safe token bucket: acquire() only waits once the burst allowance is spent"""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate  # tokens per second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Take a token, sleeping until it is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+    
+    def penalize(self, seconds):
+        """Drain the bucket so the next token is only available after `seconds`"""
+        with self._lock:
+            self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+def _retry_after(error, default=30.0):
+    """Seconds to back off after a rate-limit error, from its Retry-After header if present"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return default
+
+
 class Client:
-    def __init__(self, api_key, model_name="gemini-2.5-flash"):
+    def __init__(self, api_key, model_name="gemini-2.5-flash", cache_path="gemini_cache.db", cache_ttl=86400,
+                 requests_per_minute=10):
         self.api_key = api_key
         self.model_name = model_name
         self.client = genai.Client(api_key=self.api_key)
+        
+        # Shared across threads; only waits when calls outrun the quota
+        self._bucket = _TokenBucket(rate=requests_per_minute / 60, capacity=requests_per_minute)
+        
+        # Responses survive restarts in a small sqlite file keyed by model + prompt (None disables),
+        # with a bounded in-memory tier in front for recent keys
+        self.cache_ttl = cache_ttl
+        self._cache_lock = threading.Lock()
+        self._memory_cache = TTLCache(maxsize=1024, ttl=cache_ttl)
+        self._cache_db = None
+        if cache_path:
+            try:
+                self._cache_db = sqlite3.connect(cache_path, check_same_thread=False)
+                self._cache_db.execute("PRAGMA journal_mode=WAL")
+                self._cache_db.execute("PRAGMA synchronous=NORMAL")
+                self._cache_db.execute(
+                    "CREATE TABLE IF NOT EXISTS response (key TEXT PRIMARY KEY, result TEXT NOT NULL, expires REAL NOT NULL)"
+                )
+                self._cache_db.commit()
+            except sqlite3.Error:
+                self._cache_db = None
+        
+        # Pooled session so repeated blob downloads from the same PDS reuse connections,
+        # retrying transient CDN/gateway failures instead of failing the whole mention
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504],
+                      allowed_methods=frozenset(['GET']))
+        self._http = requests.Session()
+        self._http.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry))
+    
+    def close(self):
+        """Release pooled HTTP connections and the response cache file"""
+        self._http.close()
+        if self._cache_db is not None:
+            with self._cache_lock:
+                self._cache_db.close()
+                self._cache_db = None
+    
+    def _cache_key(self, *parts):
+        """Stable key for a request to this model"""
+        return hashlib.sha256("|".join((self.model_name,) + parts).encode()).hexdigest()
+    
+    def _cache_get(self, key):
+        """Return an unexpired cached response, or None"""
+        with self._cache_lock:
+            result = self._memory_cache.get(key)
+            if result is not None or self._cache_db is None:
+                return result
+            try:
+                row = self._cache_db.execute(
+                    "SELECT result FROM response WHERE key = ? AND expires > ?", (key, time.time())
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+            if row:
+                self._memory_cache[key] = row[0]
+        return row[0] if row else None
+    
+    def _cache_set(self, key, result):
+        """Store a successful response"""
+        with self._cache_lock:
+            self._memory_cache[key] = result
+            if self._cache_db is None:
+                return
+            try:
+                self._cache_db.execute(
+                    "INSERT OR REPLACE INTO response (key, result, expires) VALUES (?, ?, ?)",
+                    (key, result, time.time() + self.cache_ttl)
+                )
+                self._cache_db.commit()
+            except sqlite3.Error:
+                pass
 
-    def generate(self, prompt, delay=6):
+    def _generate_content(self, **kwargs):
+        """Rate-limited generate_content; a 429 holds back every caller for its Retry-After"""
+        self._bucket.acquire()
+        try:
+            return self.client.models.generate_content(**kwargs)
+        except Exception as e:
+            if getattr(e, 'code', None) == 429:
+                self._bucket.penalize(_retry_after(e))
+            raise
+    
+    def generate(self, prompt):
         """Generate content without search tools"""
-        time.sleep(delay)
+        # A cached response needs neither the API call nor a rate-limit token
+        key = self._cache_key("generate", prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
 
         config = types.GenerateContentConfig(
             max_output_tokens=8000
         )
 
-        output = self.client.models.generate_content(
+        output = self._generate_content(
             model=self.model_name,
             contents=prompt,
             config=config
@@ -27,11 +161,14 @@ class Client:
         # Try different response structures
         if hasattr(output, 'text') and output.text:
             result = output.text
+            self._cache_set(key, result)
         elif hasattr(output, 'candidates') and output.candidates:
             candidate = output.candidates[0]
             if candidate and hasattr(candidate, 'content') and candidate.content:
                 if hasattr(candidate.content, 'parts') and candidate.content.parts:
                     result = candidate.content.parts[0].text
+                    if result:
+                        self._cache_set(key, result)
                 else:
                     result = f"No parts in content. Candidate: {candidate}"
             else:
@@ -40,38 +177,62 @@ class Client:
             result = f"No candidates. Output: {output}"
         return result
     
-    def process_media(self, media_url: str, prompt: str = "Process this media content.", delay: int = 6):
+    def _upload_media(self, media_url: str):
+        """Download media and upload it to Gemini, returning the file once ACTIVE (None on timeout)"""
+        # Stream into memory (no temp files - Render-safe) without holding a second bytes copy
+        media_data = io.BytesIO()
+        with self._http.get(media_url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            shutil.copyfileobj(response.raw, media_data, 65536)
+            content_type = response.headers.get('content-type', 'application/octet-stream')
+        media_data.seek(0)
+        
+        # Upload directly from memory to Gemini
+        uploaded_file = self.client.files.upload(
+            file=media_data,
+            config=dict(mime_type=content_type)
+        )
+        
+        # Wait for file processing (especially important for videos)
+        # Back off from 250ms so images return almost immediately and long videos aren't over-polled
+        wait_time = 0
+        poll_delay = 0.25
+        while uploaded_file.state.name != 'ACTIVE' and wait_time < _MAX_ACTIVATION_WAIT:
+            time.sleep(poll_delay)
+            wait_time += poll_delay
+            poll_delay = min(poll_delay * 2, 4.0)
+            try:
+                uploaded_file = self.client.files.get(name=uploaded_file.name)
+            except:
+                break
+        
+        if uploaded_file.state.name != 'ACTIVE':
+            return None
+        return uploaded_file
+    
+    def process_media(self, media_url: str, prompt: str = "Process this media content."):
         """Download and process media from URL using in-memory processing with structured JSON output"""
-        time.sleep(delay)
+        return self.process_media_batch([media_url], prompt)
+    
+    def process_media_batch(self, media_urls: list, prompt: str = "Process this media content."):
+        """Process several media items (e.g. an image gallery) in one structured request"""
+        # Blob URLs are content-addressed (CID), so a repeat request can skip download, upload and generation
+        key = self._cache_key("media", *media_urls, prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
         
         try:
-            # Download into memory (no temp files - Render-safe)
-            response = requests.get(media_url, timeout=30)
-            response.raise_for_status()
-            
-            # Create BytesIO from response content
-            media_data = io.BytesIO(response.content)
-            content_type = response.headers.get('content-type', 'application/octet-stream')
-            
-            # Upload directly from memory to Gemini
-            uploaded_file = self.client.files.upload(
-                file=media_data,
-                config=dict(mime_type=content_type)
-            )
-            
-            # Wait for file processing (especially important for videos)
-            max_wait = 60  # seconds
-            wait_time = 0
-            while uploaded_file.state.name != 'ACTIVE' and wait_time < max_wait:
-                time.sleep(5)
-                wait_time += 5
-                try:
-                    uploaded_file = self.client.files.get(name=uploaded_file.name)
-                except:
-                    break
+            # Downloads, uploads and activation waits are independent, so overlap them
+            if len(media_urls) > 1:
+                with ThreadPoolExecutor(max_workers=min(4, len(media_urls))) as executor:
+                    uploaded_files = list(executor.map(self._upload_media, media_urls))
+            else:
+                uploaded_files = [self._upload_media(media_url) for media_url in media_urls]
             
-            if uploaded_file.state.name != 'ACTIVE':
-                return f"Error: File processing failed or timed out after {max_wait}s"
+            if not uploaded_files or any(uploaded_file is None for uploaded_file in uploaded_files):
+                return f"Error: File processing failed or timed out after {_MAX_ACTIVATION_WAIT}s"
             
             # Generate content with media and structured JSON schema
             config = types.GenerateContentConfig(
@@ -90,9 +251,9 @@ class Client:
                 max_output_tokens=8000
             )
             
-            output = self.client.models.generate_content(
+            output = self._generate_content(
                 model=self.model_name,
-                contents=[uploaded_file, prompt],
+                contents=[*uploaded_files, prompt],
                 config=config
             )
             
@@ -110,6 +271,14 @@ class Client:
                     result = f"No content in candidate. Candidate: {candidate}"
             else:
                 result = f"No candidates. Output: {output}"
+            
+            # Only cache replies the caller can use; malformed output should be retried fresh
+            try:
+                json.loads(result)
+            except (TypeError, ValueError):
+                pass
+            else:
+                self._cache_set(key, result)
                 
             return result
             
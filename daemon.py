@@ -1,80 +1,373 @@
 import time
 import logging
+import math
 import os
-from datetime import datetime
+import random
+import signal
+import sqlite3
+import threading
+from collections import deque
+import orjson
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from websockets.sync.client import connect
 from bots.transcriptionBot import MediaProcessingBot 
 
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+_SEEN_TTL = 86400  # seconds a handled mention is remembered; well past the 1h notification window
+
+_HIGH_WATER_GRACE = timedelta(minutes=5)  # re-scan this far behind the last poll for late-indexed notifications
+
+# Jetstream relays new posts as JSON over a websocket, so mentions arrive without polling
+_JETSTREAM_URL = os.getenv(
+    'SCRIBE_JETSTREAM_URL',
+    "wss://jetstream2.us-east.bsky.network/subscribe?wantedCollections=app.bsky.feed.post"
+)
+_MENTION_FACET = 'app.bsky.richtext.facet#mention'
+_INDEX_DELAY = 10  # seconds to hold a streamed mention so the AppView has indexed it before getPostThread
+_CURSOR_SAVE_INTERVAL = 5  # seconds between persisting the stream position
+_CURSOR_MAX_AGE = 3600  # older saved positions aren't replayed; the startup poll covers the notification window
+_MAX_MENTION_ATTEMPTS = 3  # failed mentions go back to the polls until this many attempts
+
+def _parse_indexed_at(notification):
+    """Notification indexedAt as an aware datetime, or None if missing/unparseable"""
+    try:
+        notification_time = datetime.fromisoformat(notification.indexed_at.replace('Z', '+00:00'))
+    except Exception:
+        return None  # If timestamp parsing fails, process anyway
+    # Compare naive timestamps as UTC rather than failing against the aware cutoff
+    return notification_time if notification_time.tzinfo else notification_time.replace(tzinfo=timezone.utc)
+
+def _mention_from_event(event, bot_did):
+    """(post uri, text) if a Jetstream event creates a post mentioning bot_did, else None"""
+    commit = event.get('commit')
+    if event.get('kind') != 'commit' or not commit or commit.get('operation') != 'create':
+        return None
+    author_did = event.get('did')
+    if author_did == bot_did:
+        return None
+    record = commit.get('record') or {}
+    for facet in record.get('facets') or ():
+        for feature in facet.get('features') or ():
+            if feature.get('$type') == _MENTION_FACET and feature.get('did') == bot_did:
+                return f"at://{author_did}/{commit.get('collection')}/{commit.get('rkey')}", record.get('text')
+    return None
+
 class Scribe(MediaProcessingBot):
-    def __init__(self):
+    def __init__(self, max_workers: int = None, seen_path: str = "seen_mentions.db",
+                 min_interval: float = 2, max_interval: float = 60, backoff_rate: float = 1.5):
         super().__init__()
+        # Poll quickly while mentions arrive, backing off exponentially while idle
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_rate = backoff_rate
+        self._idle_count = 0
+        # Idle polls past this already sleep max_interval; capping the count keeps backoff_rate ** count finite
+        if backoff_rate > 1 and max_interval > min_interval > 0:
+            self._max_idle_count = math.ceil(math.log(max_interval / min_interval, backoff_rate))
+        else:
+            self._max_idle_count = 0
+        # Set by stop(); the loops wait on it instead of sleeping so shutdown is immediate
+        self._stop = threading.Event()
+        # Independent mentions are I/O bound (Bluesky + Gemini), so handle them concurrently
+        self.max_workers = max_workers or int(os.getenv('SCRIBE_WORKERS', '4'))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="mention")
         self.bot_handle = self.bluesky_username
         self.last_processed_timestamp = None
-        # Initialize timestamp-based duplicate prevention
-        self.processed_mentions = set()
+        # Initialize timestamp-based duplicate prevention (bounded, and persisted so restarts don't redo work)
+        self.processed_mentions = TTLCache(maxsize=10000, ttl=_SEEN_TTL)
+        # Worker callbacks un-mark failed mentions, so the cache is shared with the mention threads
+        self._processed_lock = threading.Lock()
+        self._mention_failures = TTLCache(maxsize=1000, ttl=3600)
+        self._rescan_window = False  # set after a failure so the next poll ignores the high-water mark
+        # Mention workers record completions on disk, so the store is shared across threads
+        self._seen_lock = threading.Lock()
+        self._seen_db = self._open_seen_store(seen_path)
+
+    def _open_seen_store(self, seen_path):
+        """Open the persisted seen-mention store and load its recent entries (None disables)"""
+        if not seen_path:
+            return None
+        try:
+            db = sqlite3.connect(seen_path, check_same_thread=False)
+            db.execute("CREATE TABLE IF NOT EXISTS seen (uri TEXT PRIMARY KEY, seen_at REAL NOT NULL)")
+            db.execute("CREATE TABLE IF NOT EXISTS stream_cursor (name TEXT PRIMARY KEY, time_us INTEGER NOT NULL)")
+            cutoff = time.time() - _SEEN_TTL
+            db.execute("DELETE FROM seen WHERE seen_at < ?", (cutoff,))
+            db.commit()
+            for (uri,) in db.execute("SELECT uri FROM seen ORDER BY seen_at"):
+                self.processed_mentions[uri] = True
+            return db
+        except sqlite3.Error as e:
+            logger.warning(f"Seen-mention store unavailable, tracking in memory only: {e}")
+            return None
+
+    def _is_processed(self, mention_uri):
+        """Whether a mention has been dispatched (and not given back for retry)"""
+        with self._processed_lock:
+            return mention_uri in self.processed_mentions
+
+    def _mark_processed(self, mention_uris):
+        """Record mentions as dispatched in memory so later polls don't dispatch them again"""
+        with self._processed_lock:
+            for mention_uri in mention_uris:
+                self.processed_mentions[mention_uri] = True
+
+    def _persist_processed(self, mention_uri):
+        """Record a successfully handled mention on disk so a restart doesn't redo it"""
+        with self._seen_lock:
+            if self._seen_db is None:
+                return
+            try:
+                self._seen_db.execute(
+                    "INSERT OR REPLACE INTO seen (uri, seen_at) VALUES (?, ?)",
+                    (mention_uri, time.time())
+                )
+                self._seen_db.commit()
+            except sqlite3.Error as e:
+                logger.debug("Seen-mention store write failed: %s", e)
+
+    def _load_cursor(self):
+        """Saved Jetstream position in microseconds, or None if missing or too old to replay"""
+        with self._seen_lock:
+            if self._seen_db is None:
+                return None
+            try:
+                row = self._seen_db.execute("SELECT time_us FROM stream_cursor WHERE name = 'jetstream'").fetchone()
+            except sqlite3.Error:
+                return None
+        if row is None or row[0] < (time.time() - _CURSOR_MAX_AGE) * 1_000_000:
+            return None
+        return row[0]
+
+    def _save_cursor(self, time_us):
+        """Persist the Jetstream position so a restart resumes from it"""
+        with self._seen_lock:
+            if self._seen_db is None:
+                return
+            try:
+                self._seen_db.execute(
+                    "INSERT OR REPLACE INTO stream_cursor (name, time_us) VALUES ('jetstream', ?)", (time_us,)
+                )
+                self._seen_db.commit()
+            except sqlite3.Error as e:
+                logger.debug("Stream cursor write failed: %s", e)
+
+    def _on_mention_done(self, mention_uri, future):
+        """Persist a mention once its handler succeeds, or hand a failed one back to the polls for a retry"""
+        if future.cancelled():
+            return  # Shutting down; never persisted, so the startup poll retries it
+        if future.exception() is None and future.result():
+            self._persist_processed(mention_uri)
+            return
+        # Often a post the AppView hadn't indexed yet; let a later poll dispatch it again
+        with self._processed_lock:
+            attempts = self._mention_failures.get(mention_uri, 0) + 1
+            self._mention_failures[mention_uri] = attempts
+            if attempts < _MAX_MENTION_ATTEMPTS:
+                self.processed_mentions.pop(mention_uri, None)
+                self._rescan_window = True
+                return
+        logger.warning(f"Giving up on mention after {attempts} attempts: {mention_uri}")
 
     def monitor_mentions(self):
         """Monitor for mentions and process transcription requests"""
         logger.info("Starting mention monitoring for transcription bot")
         
-        while True:
+        while not self._stop.is_set():
             try:
-                notifications = self.bluesky_client.get_notifications(limit=20)
+                self._poll_mentions()
+                
+                # Sleep before next check
+                self._stop.wait(self._poll_delay())
                 
-                for notification in notifications:
-                    if hasattr(notification, 'reason') and notification.reason == 'mention':
-                        mention_uri = notification.uri
+            except Exception as e:
+                logger.error(f"Error in mention monitoring: {e}")
+                self._stop.wait(60)  # Wait longer on error
+
+    def stream_mentions(self):
+        """Handle mentions as Jetstream pushes them; notifications are polled slowly for retries, and as before while the stream is down"""
+        logger.info("Starting mention stream for transcription bot")
+        bot_did = self.bluesky_client.bot_did
+        if not bot_did:
+            logger.warning("Bot DID unknown, falling back to notification polling")
+            return self.monitor_mentions()
+        
+        # Pick up mentions sent while the daemon was down before tailing the stream
+        try:
+            self._poll_mentions()
+        except Exception as e:
+            logger.error(f"Error in mention monitoring: {e}")
+        
+        cursor = self._load_cursor()
+        saved_cursor = cursor
+        next_save = time.monotonic() + _CURSOR_SAVE_INTERVAL
+        # Failed mentions only come back through the notification poll, so keep one running while connected
+        next_poll = time.monotonic() + self.max_interval
+        # (due, time_us, uri, text) in arrival order; held back until the AppView can serve the post
+        deferred = deque()
+        while not self._stop.is_set():
+            try:
+                # Resume from the last event seen so a reconnect doesn't drop mentions
+                url = _JETSTREAM_URL
+                if cursor:
+                    url += f"{'&' if '?' in url else '?'}cursor={cursor}"
+                with connect(url, open_timeout=10) as websocket:
+                    logger.info("Connected to Jetstream")
+                    self._idle_count = 0
+                    while not self._stop.is_set():
+                        # Wake regularly so stop() doesn't wait on a quiet stream
+                        try:
+                            message = websocket.recv(timeout=1)
+                        except TimeoutError:
+                            message = None
+                        if message is not None:
+                            event = orjson.loads(message)
+                            cursor = event.get('time_us', cursor)
+                            mention = _mention_from_event(event, bot_did)
+                            if mention is not None:
+                                deferred.append((time.monotonic() + _INDEX_DELAY, cursor, *mention))
                         
-                        # Skip if already processed
-                        if mention_uri in self.processed_mentions:
-                            continue
-                            
-                        # Skip if too old (older than 1 hour)
-                        if hasattr(notification, 'indexedAt'):
-                            try:
-                                notification_time = datetime.fromisoformat(notification.indexedAt.replace('Z', '+00:00'))
-                                current_time = datetime.now(notification_time.tzinfo)
-                                time_diff = current_time - notification_time
-                                
-                                if time_diff.total_seconds() > 3600:  # 1 hour
-                                    continue
-                            except:
-                                pass  # If timestamp parsing fails, process anyway
+                        now = time.monotonic()
+                        while deferred and deferred[0][0] <= now:
+                            _, _, mention_uri, mention_text = deferred.popleft()
+                            # The fallback poll may have picked it up meanwhile
+                            if self._is_processed(mention_uri):
+                                continue
+                            logger.info(f"Processing mention: {mention_uri}")
+                            self._mark_processed([mention_uri])
+                            self.handle_mentions([mention_uri], wait=False, mention_texts={mention_uri: mention_text})
                         
-                        logger.info(f"Processing mention: {mention_uri}")
-                        self.handle_mention(mention_uri)
-                        self.processed_mentions.add(mention_uri)
+                        if now >= next_poll:
+                            try:
+                                self._poll_mentions()
+                            except Exception as e:
+                                logger.error(f"Error in mention monitoring: {e}")
+                            # The stream sets the pace while connected; don't carry poll backoff into a reconnect
+                            self._idle_count = 0
+                            next_poll = now + self.max_interval
                         
-                        # Clean old processed mentions (keep last 1000)
-                        if len(self.processed_mentions) > 1000:
-                            self.processed_mentions = set(list(self.processed_mentions)[-500:])
-                
-                # Sleep before next check
-                time.sleep(30)
-                
+                        if now >= next_save:
+                            # Never save past a mention that hasn't been dispatched yet
+                            resume_at = deferred[0][1] - 1 if deferred else cursor
+                            if resume_at and resume_at != saved_cursor:
+                                self._save_cursor(resume_at)
+                                saved_cursor = resume_at
+                            next_save = now + _CURSOR_SAVE_INTERVAL
+            except Exception as e:
+                logger.warning(f"Jetstream unavailable, polling notifications until reconnect: {e}")
+            if self._stop.is_set():
+                break
+            
+            # Catch anything missed while disconnected, then retry the stream with backoff
+            try:
+                self._poll_mentions()
             except Exception as e:
                 logger.error(f"Error in mention monitoring: {e}")
-                time.sleep(60)  # Wait longer on error
+            self._stop.wait(self._poll_delay())
+
+    def stop(self):
+        """Ask the monitoring loop to return; safe to call from a signal handler or another thread"""
+        self._stop.set()
 
-    def handle_mention(self, mention_uri):
-        """Handle a single mention for transcription"""
+    def close(self):
+        """Finish in-flight mentions, then release the clients' connections and cache files"""
+        # Queued mentions are dropped rather than run past the platform's SIGKILL deadline; they were never
+        # persisted, so the startup poll picks them up again
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._seen_lock:
+            if self._seen_db is not None:
+                self._seen_db.close()
+                self._seen_db = None
+        self.bluesky_client.close()
+        self.gemini_client.close()
+
+    def _poll_mentions(self):
+        """One notification poll: dispatch new mentions and update the idle backoff"""
+        notifications = self.bluesky_client.get_notifications(limit=20)
+        
+        pending_mentions = []
+        mention_texts = {}
+        newest_time = self.last_processed_timestamp
+        with self._processed_lock:
+            rescan, self._rescan_window = self._rescan_window, False
+        
+        # One cutoff per poll: the 1 hour window, or the last poll's high-water mark if later
+        # (unless a failed mention needs the whole window again)
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=1)
+        if newest_time is not None and not rescan:
+            cutoff = max(cutoff, newest_time - _HIGH_WATER_GRACE)
+        
+        for notification in notifications:
+            notification_time = _parse_indexed_at(notification)
+            
+            # Notifications come newest first, so everything after the cutoff is older still
+            if notification_time is not None:
+                if notification_time < cutoff:
+                    break
+                if newest_time is None or notification_time > newest_time:
+                    newest_time = notification_time
+            
+            # Every atproto Notification carries reason; a missing one is a bug, not a mention
+            if notification.reason == 'mention':
+                mention_uri = notification.uri
+                
+                # Skip if already processed
+                if self._is_processed(mention_uri):
+                    continue
+                
+                logger.info(f"Processing mention: {mention_uri}")
+                pending_mentions.append(mention_uri)
+                # The notification already carries the mention's record
+                mention_texts[mention_uri] = getattr(getattr(notification, 'record', None), 'text', None)
+        
+        self.last_processed_timestamp = newest_time
+        
+        if pending_mentions:
+            # Mark before dispatching so a fast failure's un-mark isn't overwritten, and don't wait so a
+            # slow video doesn't hold up the next poll
+            self._mark_processed(pending_mentions)
+            self.handle_mentions(pending_mentions, wait=False, mention_texts=mention_texts)
+            self._idle_count = 0
+        else:
+            self._idle_count = min(self._idle_count + 1, self._max_idle_count)
+
+    def _poll_delay(self) -> float:
+        """Seconds until the next poll: exponential in consecutive idle polls, capped, with ±20% jitter"""
+        delay = min(self.max_interval, self.min_interval * (self.backoff_rate ** self._idle_count))
+        # Symmetric jitter keeps the mean interval while spreading instances that started together
+        return delay * random.uniform(0.8, 1.2)
+
+    def handle_mentions(self, mention_uris, wait: bool = True, mention_texts=None):
+        """Handle a batch of independent mentions concurrently, optionally waiting for all of them"""
+        mention_texts = mention_texts or {}
+        # Reuse one bounded pool across polls instead of spawning threads per batch
+        futures = []
+        for mention_uri in mention_uris:
+            future = self._executor.submit(self.handle_mention, mention_uri, mention_texts.get(mention_uri))
+            future.add_done_callback(lambda done, mention_uri=mention_uri: self._on_mention_done(mention_uri, done))
+            futures.append(future)
+        if wait:
+            for future in as_completed(futures):
+                future.result()
+        return futures
+
+    def handle_mention(self, mention_uri, mention_text=None):
+        """Handle a single mention for transcription (pass mention_text if already known); True once it needs no retry"""
         try:
-            logger.debug(f"Handling mention: {mention_uri}")
+            logger.debug("Handling mention: %s", mention_uri)
             
             # Check for duplicate processing
             if self.bluesky_client.has_bot_already_replied(mention_uri, self.bluesky_username):
-                logger.debug(f"Already replied to this mention, skipping")
-                return
+                logger.debug("Already replied to this mention, skipping")
+                return True
             
             # Get mention text for language detection
-            mention_text = self.get_mention_text(mention_uri)
+            if mention_text is None:
+                mention_text = self.get_mention_text(mention_uri)
             
             # Proceed with transcription
             result = self.post_transcription_reply(mention_uri, mention_text)
@@ -83,18 +376,38 @@ class Scribe(MediaProcessingBot):
                 logger.info(f"Successfully processed mention")
             else:
                 logger.error(f"Failed to process mention")
+            return bool(result)
             
         except Exception as e:
             logger.error(f"Error handling mention {mention_uri}: {e}")
+            return False
 
     def get_mention_text(self, mention_uri):
         """Get the text content of a mention"""
         try:
             return self.bluesky_client.get_post_text(mention_uri)
         except Exception as e:
-            logger.debug(f"Error getting mention text: {e}")
+            logger.debug("Error getting mention text: %s", e)
             return None
 
 if __name__ == "__main__":
+    # Configure logging once, here at the entry point; force replaces the handler the bot module
+    # installs at import so this format actually applies
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        force=True
+    )
     scribe = Scribe()
-    scribe.monitor_mentions()
\ No newline at end of file
+    # Platform restarts send SIGTERM; leave the loop at once instead of after the current sleep
+    signal.signal(signal.SIGTERM, lambda *_: scribe.stop())
+    # SCRIBE_POLL_ONLY=1 skips Jetstream and polls notifications as before
+    try:
+        if os.getenv('SCRIBE_POLL_ONLY') == '1':
+            scribe.monitor_mentions()
+        else:
+            scribe.stream_mentions()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scribe.close()
\ No newline at end of file